@@ -0,0 +1,318 @@
+"""
+Database Benchmarks
+Times persisting PBC items the ORM way (one PBCItem object per row, flushed
+on commit) against database.bulk_insert_pbc_items (one executemany Core
+INSERT) on a scratch SQLite database.
+
+--stress runs concurrent "users" (threads doing dashboard reads, signups,
+project creation and PBC status changes) against the engine as it used to be set up (default
+journal, every session committing its own writes) and against the tuned
+engine with the single-writer queue, and fails if the queue path hits any
+"database is locked" error.
+
+Run from the .streamlit directory:
+    python bench_database.py                          # 100, 1k, 10k and 100k rows
+    python bench_database.py --sizes 5000 --output db.json
+    python bench_database.py --stress --threads 32 --ops 200
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from bench_mapper import _git_commit
+from database import (AuditProject, Base, ClientProfile, PBCComment, PBCItem, PBCStatus, User, UserRole,
+                      WriteQueue, _create_engine, bulk_insert_pbc_items)
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+DEFAULT_THREADS = 32
+DEFAULT_OPS = 200
+# Share of stress operations that write; the rest are dashboard reads
+WRITE_SHARE = 0.3
+# Stand-in for scoring a TB while a new project is created
+MAPPING_SECONDS = 0.25
+
+
+def generate_items(n_rows: int) -> List[Dict]:
+    """build_pbc_items-shaped records; real projects have ~100, ledger-level tables far more."""
+    return [{
+        'Item_Number': number,
+        'Category': "Trade Receivables",
+        'Item_Description': f"Debtors list with ageing for Customer {number}. Include confirmation letters.",
+        'Why_Needed': "To confirm existence, recoverability and completeness of receivables",
+        'Priority': ("High", "Medium", "Low")[number % 3]
+    } for number in range(1, n_rows + 1)]
+
+
+def _scratch_project(directory: str, name: str):
+    """Fresh SQLite file with one project; returns (engine, Session, project_id)."""
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}.db",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    # SQLite does not enforce foreign keys here, so no CA or client rows are needed
+    project = AuditProject(ca_id=1, client_id=1, project_name="Bench", financial_year="2025-26")
+    db.add(project)
+    db.commit()
+    project_id = project.project_id
+    db.close()
+    return engine, Session, project_id
+
+
+def _insert_orm(db, project_id: int, items: List[Dict]):
+    """What show_ca_new_project did before bulk_insert_pbc_items."""
+    for item in items:
+        db.add(PBCItem(
+            project_id=project_id,
+            item_number=item['Item_Number'],
+            category=item['Category'],
+            item_description=item['Item_Description'],
+            why_needed=item['Why_Needed'],
+            priority=item['Priority'],
+            status=PBCStatus.PENDING,
+            ai_generated=True
+        ))
+
+
+def _insert_bulk(db, project_id: int, items: List[Dict]):
+    bulk_insert_pbc_items(db, project_id, items)
+
+
+def benchmark_insert(directory: str, method: str, items: List[Dict]) -> Dict:
+    """Insert and commit all items in one transaction; time includes the commit."""
+    engine, Session, project_id = _scratch_project(directory, f"{method}_{len(items)}")
+    insert = _insert_bulk if method == "bulk" else _insert_orm
+    db = Session()
+    try:
+        start = time.perf_counter()
+        insert(db, project_id, items)
+        db.commit()
+        seconds = time.perf_counter() - start
+        stored = db.scalar(select(func.count()).select_from(PBCItem).where(PBCItem.project_id == project_id))
+    finally:
+        db.close()
+        engine.dispose()
+
+    return {
+        'method': method,
+        'seconds': round(seconds, 4),
+        'rows_per_sec': round(len(items) / seconds, 1) if seconds else None,
+        'rows_stored': stored
+    }
+
+
+def run_benchmarks(sizes: List[int] = DEFAULT_SIZES) -> Dict:
+    """Benchmark both insert paths at each size and collect a JSON-ready report."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in sizes:
+            items = generate_items(n_rows)
+            entry = {'rows': n_rows, 'methods': [benchmark_insert(directory, method, items)
+                                                 for method in ("orm", "bulk")]}
+            orm_run, bulk_run = entry['methods']
+            entry['speedup'] = round(orm_run['seconds'] / bulk_run['seconds'], 2) if bulk_run['seconds'] else None
+            entry['counts_match'] = orm_run['rows_stored'] == bulk_run['rows_stored'] == n_rows
+            results.append(entry)
+
+    return {
+        'benchmark': 'pbc_item_persistence',
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+
+def _create_project(db, items: List[Dict], mapping_seconds: float = 0.0):
+    project = AuditProject(ca_id=1, client_id=1, project_name="Stress", financial_year="2025-26")
+    db.add(project)
+    db.flush()
+    # show_ca_new_project used to map the TB here, inside the open write transaction
+    time.sleep(mapping_seconds)
+    bulk_insert_pbc_items(db, project.project_id, items)
+
+
+def _signup(db, worker: int, op: int):
+    user = User(email=f"user{worker}_{op}@example.com", password_hash="x", full_name=f"User {worker}",
+                role=UserRole.CLIENT, company_name="Stress Ltd")
+    db.add(user)
+    db.flush()
+    db.add(ClientProfile(user_id=user.user_id, company_name="Stress Ltd"))
+
+
+def _status_change(db, pbc_id: int, worker: int):
+    item = db.get(PBCItem, pbc_id)
+    item.status = PBCStatus.SUBMITTED if item.status == PBCStatus.PENDING else PBCStatus.PENDING
+    db.add(PBCComment(pbc_id=pbc_id, user_id=worker + 1, comment_text="Status changed"))
+
+
+def _dashboard_read(db, project_id: int) -> int:
+    items = db.query(PBCItem).filter(PBCItem.project_id == project_id).all()
+    return sum(1 for item in items if item.status == PBCStatus.SUBMITTED)
+
+
+def _stress_worker(method: str, Session, writer, project_id: int, pbc_ids: List[int], worker: int,
+                   n_ops: int, stats: Dict, lock: threading.Lock):
+    rng = random.Random(worker)
+    items = generate_items(100)
+    read_seconds, writes, lock_errors, other_errors = [], 0, 0, []
+    for op in range(n_ops):
+        is_write = rng.random() < WRITE_SHARE
+        if is_write:
+            pbc_id = rng.choice(pbc_ids)
+            if op % 10 == 0:
+                # The queue path maps first and only queues the inserts, as main.py does now
+                mapping_seconds = MAPPING_SECONDS if method == "direct" else 0.0
+                job = lambda db: _create_project(db, items, mapping_seconds)
+            elif op % 2:
+                job = lambda db: _signup(db, worker, op)
+            else:
+                job = lambda db: _status_change(db, pbc_id, worker)
+        db = Session()
+        try:
+            if not is_write:
+                start = time.perf_counter()
+                _dashboard_read(db, project_id)
+                read_seconds.append(time.perf_counter() - start)
+            elif method == "queue":
+                if op % 10 == 0:
+                    time.sleep(MAPPING_SECONDS)
+                writer.run(job)
+                writes += 1
+            else:
+                job(db)
+                db.commit()
+                writes += 1
+        except OperationalError as e:
+            db.rollback()
+            if "locked" in str(e):
+                lock_errors += 1
+            else:
+                other_errors.append(str(e.orig))
+        except Exception as e:
+            db.rollback()
+            other_errors.append(str(e))
+        finally:
+            db.close()
+    with lock:
+        stats['read_seconds'].extend(read_seconds)
+        stats['writes'] += writes
+        stats['lock_errors'] += lock_errors
+        stats['other_errors'].extend(other_errors)
+
+
+def stress_test(directory: str, method: str, n_threads: int = DEFAULT_THREADS, n_ops: int = DEFAULT_OPS) -> Dict:
+    """
+    n_threads users each doing n_ops mixed reads and writes at once.
+    "direct" is the old setup: a plain engine and each session committing
+    its own writes. "queue" is database._create_engine (pool and SQLite
+    pragmas) with every write sent through a WriteQueue.
+    """
+    url = f"sqlite:///{os.path.join(directory, method)}_stress.db"
+    if method == "queue":
+        engine = _create_engine(url)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        project = AuditProject(ca_id=1, client_id=1, project_name="Stress", financial_year="2025-26")
+        db.add(project)
+        db.flush()
+        project_id = project.project_id
+        bulk_insert_pbc_items(db, project_id, generate_items(100))
+        db.commit()
+        pbc_ids = db.scalars(select(PBCItem.pbc_id)).all()
+
+    writer = WriteQueue(sessionmaker(bind=engine, expire_on_commit=False)) if method == "queue" else None
+    stats = {'read_seconds': [], 'writes': 0, 'lock_errors': 0, 'other_errors': []}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=_stress_worker,
+                                args=(method, Session, writer, project_id, pbc_ids, worker, n_ops, stats, lock))
+               for worker in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    if writer is not None:
+        writer.close()
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+    engine.dispose()
+
+    read_ms = np.array(stats['read_seconds']) * 1000
+    return {
+        'method': method,
+        'journal_mode': journal_mode,
+        'threads': n_threads,
+        'ops_per_thread': n_ops,
+        'seconds': round(seconds, 3),
+        'writes': stats['writes'],
+        'writes_per_sec': round(stats['writes'] / seconds, 1),
+        'lock_errors': stats['lock_errors'],
+        'other_errors': len(stats['other_errors']),
+        'other_error_examples': sorted(set(stats['other_errors']))[:5],
+        'read_ms_p50': round(float(np.percentile(read_ms, 50)), 2) if read_ms.size else None,
+        'read_ms_p95': round(float(np.percentile(read_ms, 95)), 2) if read_ms.size else None,
+        'write_batches': writer.stats['batches'] if writer is not None else None
+    }
+
+
+def run_stress(n_threads: int = DEFAULT_THREADS, n_ops: int = DEFAULT_OPS) -> Dict:
+    """Stress both write paths and collect a JSON-ready report."""
+    with tempfile.TemporaryDirectory() as directory:
+        results = [stress_test(directory, method, n_threads, n_ops) for method in ("direct", "queue")]
+    return {
+        'benchmark': 'sqlite_concurrency',
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PBC item persistence")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stress", action="store_true", help="Run the concurrent read/write stress test instead")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS, help="Operations per stress thread")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_stress(args.threads, args.ops) if args.stress else run_benchmarks(args.sizes)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if args.stress:
+        queue_run = report['results'][-1]
+        if queue_run['lock_errors'] or queue_run['other_errors']:
+            raise SystemExit("Single-writer path reported database errors")
+    elif not all(entry['counts_match'] for entry in report['results']):
+        raise SystemExit("Stored row counts differ between insert paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Ingestion Benchmarks
+Times the tb_ingest readers against plain pd.read_csv / pd.read_excel on
+synthetic trial balance files and reports the peak memory of each reader.
+
+Run from the .streamlit directory:
+    python bench_ingest.py                          # 10k and 100k ledgers, CSV and XLSX
+    python bench_ingest.py --sizes 50000 --formats xlsx --output ingest.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from bench_mapper import _git_commit, generate_synthetic_tb
+from tb_ingest import read_trial_balance
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_FORMATS = ["csv", "xlsx"]
+
+
+def format_indian_amount(amount: float, suffix: str = "") -> str:
+    """Format an amount with lakh/crore grouping, e.g. 123456.0 -> "1,23,456.00"."""
+    whole, fraction = f"{abs(amount):.2f}".split(".")
+    if len(whole) > 3:
+        head, tail = whole[:-3], whole[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        whole = ",".join(groups + [tail])
+    text = f"{whole}.{fraction}"
+    return f"{text} {suffix}" if suffix else text
+
+
+def write_benchmark_file(n_ledgers: int, file_format: str, directory: str, seed: int = 42) -> str:
+    """
+    Write a synthetic TB as an export would look: Indian-format text amounts
+    with Dr/Cr suffixes, blank zero cells and extra columns nobody maps.
+    """
+    tb_df = generate_synthetic_tb(n_ledgers, seed)
+    rng = np.random.default_rng(seed)
+
+    def amounts(values: pd.Series, suffix: str) -> List[str]:
+        return [format_indian_amount(value, suffix) if value else "" for value in values]
+
+    export_df = pd.DataFrame({
+        'S.No': np.arange(1, n_ledgers + 1),
+        'Group': rng.choice(["Current Assets", "Indirect Expenses", "Sundry Creditors", "Sales Accounts"], n_ledgers),
+        'Account Name': tb_df['Account Name'],
+        'Opening Balance': amounts(tb_df['Debit'] * 0.8, "Dr"),
+        'Debit': amounts(tb_df['Debit'], "Dr"),
+        'Credit': amounts(tb_df['Credit'], "Cr"),
+        'Closing Balance': amounts(tb_df['Debit'] - tb_df['Credit'], ""),
+        'Remarks': ""
+    })
+
+    path = os.path.join(directory, f"tb_{n_ledgers}.{file_format}")
+    if file_format == "csv":
+        export_df.to_csv(path, index=False)
+    else:
+        export_df.to_excel(path, index=False)
+    return path
+
+
+def _read_with_pandas(path: str) -> pd.DataFrame:
+    """What show_ca_new_project did before tb_ingest."""
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def _read_with_tb_ingest(path: str) -> pd.DataFrame:
+    return read_trial_balance(path)
+
+
+def benchmark_reader(path: str, reader: str) -> Dict:
+    """
+    Read one file with one reader in a fresh process: once timed, then once
+    under tracemalloc for peak memory. Arrow buffers are outside the Python
+    heap, so the pool's own high-water mark is reported alongside.
+    """
+    read = _read_with_tb_ingest if reader == "tb_ingest" else _read_with_pandas
+
+    start = time.perf_counter()
+    df = read(path)
+    seconds = time.perf_counter() - start
+    frame_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+    rows = len(df)
+    columns = list(df.columns)
+    numeric_amounts = bool(pd.api.types.is_float_dtype(df['Debit']))
+    del df
+
+    tracemalloc.start()
+    read(path)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'reader': reader,
+        'seconds': round(seconds, 4),
+        'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        'peak_python_mb': round(peak_bytes / (1024 * 1024), 2),
+        'peak_arrow_mb': round(pa.default_memory_pool().max_memory() / (1024 * 1024), 2),
+        'frame_mb': round(frame_mb, 2),
+        'columns': columns,
+        'numeric_amounts': numeric_amounts
+    }
+
+
+def run_benchmarks(sizes: List[int] = DEFAULT_SIZES, formats: List[str] = DEFAULT_FORMATS, seed: int = 42) -> Dict:
+    """Benchmark each size, format and reader in its own process and collect a JSON-ready report."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_ledgers in sizes:
+            for file_format in formats:
+                path = write_benchmark_file(n_ledgers, file_format, directory, seed)
+                entry = {
+                    'ledgers': n_ledgers,
+                    'format': file_format,
+                    'file_mb': round(os.path.getsize(path) / (1024 * 1024), 2),
+                    'readers': []
+                }
+                for reader in ("pandas", "tb_ingest"):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                        entry['readers'].append(pool.submit(benchmark_reader, path, reader).result())
+
+                pandas_run, ingest_run = entry['readers']
+                entry['speedup'] = (round(pandas_run['seconds'] / ingest_run['seconds'], 2)
+                                    if ingest_run['seconds'] else None)
+                results.append(entry)
+
+    return {
+        'benchmark': 'tb_ingest',
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trial balance ingestion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--formats", nargs="+", choices=DEFAULT_FORMATS, default=DEFAULT_FORMATS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.formats, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
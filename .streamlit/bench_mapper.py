@@ -0,0 +1,376 @@
+"""
+Mapper Benchmarks
+Measures how TrialBalanceToPBCMapper scales on synthetic trial balances and
+checks that optimized paths return exactly what the exhaustive scorer returns.
+
+Run from the .streamlit directory:
+    python bench_mapper.py                          # 1k, 10k, 100k, 1M ledgers
+    python bench_mapper.py --sizes 1000 10000 --output bench.json
+    python bench_mapper.py --pruning                # pruned vs exhaustive scorer
+    python bench_mapper.py --startup                # compiled dictionary cache vs compiling
+    python bench_mapper.py --pbc-items --sizes 100000  # groupby PBC item builder vs per-category loop
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pbc_builder import (PBC_ITEM_COLUMNS, build_pbc_items, determine_priority, generate_pbc_description,
+                         generate_why_needed, get_major_category)
+from tb_mapper import UNMAPPED_CATEGORY, TrialBalanceToPBCMapper
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Common ledger abbreviations seen in Tally/Busy exports
+ABBREVIATIONS = {
+    "account": "a/c", "expenses": "exp", "expense": "exp", "provision": "prov",
+    "interest": "int", "advance": "adv", "receivable": "rec", "payable": "pay",
+    "depreciation": "depr", "salary": "sal", "charges": "chgs", "limited": "ltd"
+}
+PREFIXES = ["HDFC", "SBI", "ICICI", "Axis", "Sundry", "Provision for", "Outstanding",
+            "Advance to", "Mumbai Branch", "Delhi Office"]
+SUFFIXES = ["A/c", "Account", "Exp.", "- Mumbai", "FY 2024-25", "(Old)", "Ltd", "Pvt Ltd", "- Unit 2"]
+PARTIES = ["Sharma Traders", "Gupta & Sons", "Patel Enterprises", "Reddy Industries",
+           "Kumar Agencies", "Mehta Exports", "Singh Logistics", "Iyer Associates"]
+
+
+def sample_ledger_names(mapper: TrialBalanceToPBCMapper, count: int = 2000, seed: int = 42) -> List[str]:
+    """Ledger-like names drawn from the keyword dictionary with light decoration."""
+    rng = random.Random(seed)
+    phrases = [phrase
+               for keywords in mapper.keyword_dictionary.values()
+               for phrase in keywords.get("keywords", []) + keywords.get("variations", [])]
+    prefixes = ["", "", "HDFC", "SBI", "Sundry", "Provision for", "Outstanding"]
+    suffixes = ["", "", "A/c", "Account", "Exp.", "- Mumbai", "FY 2024-25"]
+
+    names = []
+    for _ in range(count):
+        name = " ".join(part for part in (rng.choice(prefixes), rng.choice(phrases), rng.choice(suffixes)) if part)
+        names.append(name.title() if rng.random() < 0.5 else name)
+    return names
+
+
+def _add_typo(name: str, rng: random.Random) -> str:
+    """Drop, duplicate or swap one character."""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    kind = rng.random()
+    if kind < 0.33:
+        return name[:i] + name[i + 1:]
+    if kind < 0.66:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def _abbreviate(name: str) -> str:
+    """Replace whole words with their usual ledger abbreviation."""
+    return " ".join(ABBREVIATIONS.get(word.lower(), word) for word in name.split())
+
+
+def generate_synthetic_tb(n_ledgers: int, seed: int = 42, unique_ratio: float = 0.3) -> pd.DataFrame:
+    """
+    Build a realistic synthetic trial balance with Account Name/Debit/Credit columns.
+
+    Names come from the keyword dictionary plus bank/party noise, abbreviations,
+    casing changes and typos. unique_ratio controls how many distinct names are
+    drawn before rows repeat, as real GL-style dumps repeat ledgers heavily.
+    """
+    rng = random.Random(seed)
+    mapper = TrialBalanceToPBCMapper()
+    phrases = [phrase
+               for keywords in mapper.keyword_dictionary.values()
+               for phrase in keywords.get("keywords", []) + keywords.get("variations", [])]
+
+    n_unique = max(1, int(n_ledgers * unique_ratio))
+    unique_names = []
+    for _ in range(n_unique):
+        parts = [rng.choice(phrases)]
+        roll = rng.random()
+        if roll < 0.25:
+            parts.insert(0, rng.choice(PREFIXES))
+        elif roll < 0.4:
+            parts.append(f"- {rng.choice(PARTIES)}")
+        if rng.random() < 0.4:
+            parts.append(rng.choice(SUFFIXES))
+        name = " ".join(parts)
+
+        if rng.random() < 0.3:
+            name = _abbreviate(name)
+        if rng.random() < 0.1:
+            name = _add_typo(name, rng)
+        if rng.random() < 0.05:
+            name = f"{name} {rng.randint(1, 9999)}"
+        case = rng.random()
+        name = name.upper() if case < 0.15 else name.title() if case < 0.6 else name
+        unique_names.append(name)
+
+    np_rng = np.random.default_rng(seed)
+    names = np.array(unique_names, dtype=object)[np_rng.integers(0, n_unique, n_ledgers)]
+    amounts = np.round(np_rng.lognormal(mean=11, sigma=2, size=n_ledgers), 2)
+    is_debit = np_rng.random(n_ledgers) < 0.5
+
+    return pd.DataFrame({
+        'Account Name': names,
+        'Debit': np.where(is_debit, amounts, 0.0),
+        'Credit': np.where(is_debit, 0.0, amounts)
+    })
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 2)
+
+
+def benchmark_size(n_ledgers: int, seed: int = 42, latency_sample: int = 1000) -> Dict:
+    """
+    Benchmark one trial balance size. Meant to run in a fresh process so
+    peak RSS reflects this size only.
+    """
+    tb_df = generate_synthetic_tb(n_ledgers, seed)
+    mapper = TrialBalanceToPBCMapper()
+
+    start = time.perf_counter()
+    result_df = mapper.process_trial_balance(
+        df=tb_df,
+        ledger_column='Account Name',
+        debit_column='Debit',
+        credit_column='Credit',
+        threshold=60
+    )
+    process_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = mapper.generate_pbc_summary(result_df)
+    summary_seconds = time.perf_counter() - start
+
+    # Per-ledger latency of the single-ledger API on a sample of distinct names
+    sample = pd.unique(tb_df['Account Name'])[:latency_sample]
+    latencies = []
+    for name in sample:
+        ledger_start = time.perf_counter()
+        mapper.map_ledger_to_pbc(str(name), 60)
+        latencies.append((time.perf_counter() - ledger_start) * 1000)
+
+    return {
+        'ledgers': n_ledgers,
+        'unique_ledgers': int(tb_df['Account Name'].nunique()),
+        'process_trial_balance': {
+            'seconds': round(process_seconds, 4),
+            'ledgers_per_sec': round(n_ledgers / process_seconds, 1) if process_seconds else None
+        },
+        'generate_pbc_summary': {
+            'seconds': round(summary_seconds, 4),
+            'ledgers_per_sec': round(n_ledgers / summary_seconds, 1) if summary_seconds else None
+        },
+        'map_ledger_latency_ms': {
+            'sample': len(latencies),
+            'p50': round(float(np.percentile(latencies, 50)), 4),
+            'p99': round(float(np.percentile(latencies, 99)), 4)
+        },
+        'success_rate': summary['success_rate'],
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+def benchmark_candidate_pruning(ledger_names: List[str], threshold: int = 60) -> Dict:
+    """
+    Time map_ledger_to_pbc with and without inverted-index pruning and
+    count any ledger whose result differs between the two.
+    """
+    mapper = TrialBalanceToPBCMapper()
+
+    start = time.perf_counter()
+    exhaustive = [mapper.map_ledger_to_pbc(name, threshold, prune=False) for name in ledger_names]
+    exhaustive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pruned = [mapper.map_ledger_to_pbc(name, threshold, prune=True) for name in ledger_names]
+    pruned_seconds = time.perf_counter() - start
+
+    candidate_counts = [
+        len(mapper._candidate_categories(ledger, mapper._keyword_scores(ledger)))
+        for ledger in (mapper._normalize_text(name) for name in ledger_names)
+    ]
+    mismatches = [name for name, a, b in zip(ledger_names, exhaustive, pruned) if a != b]
+
+    return {
+        'ledgers': len(ledger_names),
+        'categories': len(mapper.keyword_dictionary),
+        'avg_candidates': round(sum(candidate_counts) / max(len(candidate_counts), 1), 2),
+        'exhaustive_seconds': round(exhaustive_seconds, 4),
+        'pruned_seconds': round(pruned_seconds, 4),
+        'speedup': round(exhaustive_seconds / pruned_seconds, 2) if pruned_seconds else None,
+        'mismatches': mismatches
+    }
+
+
+def benchmark_startup(repeats: int = 20) -> Dict:
+    """
+    Time mapper construction when compiling the keyword dictionary from
+    scratch versus loading its precompiled cache file.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        TrialBalanceToPBCMapper(compiled_cache_dir=cache_dir)  # writes the cache file
+        
+        timings = {}
+        for label, compiled_cache_dir in (('compile', None), ('cached', cache_dir)):
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                TrialBalanceToPBCMapper(compiled_cache_dir=compiled_cache_dir)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = round(float(np.median(samples)), 3)
+    
+    return {
+        'repeats': repeats,
+        'compile_ms': timings['compile'],
+        'cached_ms': timings['cached'],
+        'speedup': round(timings['compile'] / timings['cached'], 2) if timings['cached'] else None
+    }
+
+
+def _pbc_items_per_category(mapping_result: pd.DataFrame) -> pd.DataFrame:
+    """PBC items built the way show_ca_new_project used to: one boolean mask per category."""
+    rows = []
+    pbc_categories = mapping_result[mapping_result['PBC_Category'] != UNMAPPED_CATEGORY]['PBC_Category'].unique()
+    for item_number, pbc_category in enumerate(pbc_categories, start=1):
+        category_ledgers = mapping_result[mapping_result['PBC_Category'] == pbc_category]
+        total_debit = category_ledgers['Debit_Amount'].sum()
+        total_credit = category_ledgers['Credit_Amount'].sum()
+        rows.append({
+            'Item_Number': item_number,
+            'PBC_Category': pbc_category,
+            'Category': get_major_category(pbc_category),
+            'Item_Description': generate_pbc_description(pbc_category, category_ledgers),
+            'Why_Needed': generate_why_needed(pbc_category),
+            'Priority': determine_priority(pbc_category, total_debit, total_credit),
+            'Ledger_Count': len(category_ledgers),
+            'Debit_Amount': total_debit,
+            'Credit_Amount': total_credit
+        })
+    return pd.DataFrame(rows, columns=PBC_ITEM_COLUMNS)
+
+
+def benchmark_pbc_items(n_ledgers: int, seed: int = 42, threshold: int = 60) -> Dict:
+    """
+    Time build_pbc_items against the per-category mask loop on one mapping
+    result and list any category whose item differs between the two.
+    """
+    mapper = TrialBalanceToPBCMapper()
+    mapping_result = mapper.process_trial_balance(
+        generate_synthetic_tb(n_ledgers, seed), 'Account Name', 'Debit', 'Credit', threshold
+    )
+    
+    start = time.perf_counter()
+    expected = _pbc_items_per_category(mapping_result)
+    loop_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    items = build_pbc_items(mapping_result)
+    groupby_seconds = time.perf_counter() - start
+    
+    merged = expected.merge(items, on='PBC_Category', how='outer', suffixes=('_loop', '_groupby'), indicator=True)
+    mismatches = []
+    for row in merged.to_dict('records'):
+        same = row['_merge'] == 'both' and all(
+            np.isclose(row[f"{column}_loop"], row[f"{column}_groupby"])
+            if column in ('Debit_Amount', 'Credit_Amount') else row[f"{column}_loop"] == row[f"{column}_groupby"]
+            for column in PBC_ITEM_COLUMNS if column != 'PBC_Category'
+        )
+        if not same:
+            mismatches.append(row['PBC_Category'])
+    
+    return {
+        'ledgers': n_ledgers,
+        'pbc_items': len(items),
+        'loop_seconds': round(loop_seconds, 4),
+        'groupby_seconds': round(groupby_seconds, 4),
+        'speedup': round(loop_seconds / groupby_seconds, 2) if groupby_seconds else None,
+        'mismatches': mismatches
+    }
+
+
+def _git_commit() -> Optional[str]:
+    """Current commit hash, so runs can be compared across commits."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: List[int] = DEFAULT_SIZES, seed: int = 42) -> Dict:
+    """Benchmark each size in its own process and collect a JSON-ready report."""
+    results = []
+    for n_ledgers in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results.append(pool.submit(benchmark_size, n_ledgers, seed).result())
+
+    return {
+        'benchmark': 'tb_mapper',
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TrialBalanceToPBCMapper")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--pruning", action="store_true",
+                        help="Compare pruned and exhaustive scoring instead")
+    parser.add_argument("--startup", action="store_true",
+                        help="Compare mapper startup with and without the compiled dictionary cache")
+    parser.add_argument("--pbc-items", action="store_true",
+                        help="Compare the groupby PBC item builder with the per-category loop")
+    args = parser.parse_args()
+
+    if args.pruning:
+        report = benchmark_candidate_pruning(sample_ledger_names(TrialBalanceToPBCMapper(), seed=args.seed))
+    elif args.startup:
+        report = benchmark_startup()
+    elif args.pbc_items:
+        report = {'benchmark': 'pbc_items', 'results': [benchmark_pbc_items(n, args.seed) for n in args.sizes]}
+    else:
+        report = run_benchmarks(args.sizes, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    if args.pruning and report['mismatches']:
+        raise SystemExit(f"Pruned scorer disagreed on {len(report['mismatches'])} ledgers")
+    if args.pbc_items and any(result['mismatches'] for result in report['results']):
+        raise SystemExit("PBC item builder disagreed with the per-category loop")
+
+
+if __name__ == "__main__":
+    main()
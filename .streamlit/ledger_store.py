@@ -0,0 +1,111 @@
+"""
+Ledger Mapping Store
+Keeps the ledger-level mapping result of each project's trial balance on disk,
+so revisions, views and exports don't have to re-read and remap the TB file.
+
+Each project is one zstd-compressed Parquet file. Repeating text columns are
+stored as categoricals and scores as float32, and readers can load just the
+columns (or just the PBC category) they need.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LEDGER_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ledger_store")
+
+# Parquet schema metadata key for the mapper version, threshold and PBC item numbers
+METADATA_KEY = b"pbc_mapping"
+
+# Low-cardinality text columns of the mapping result
+CATEGORICAL_COLUMNS = ["PBC_Category", "Confidence_Level", "Match_Method", "Matched_Keyword"]
+
+
+def _store_path(project_id: int, store_dir: str = LEDGER_STORE_DIR) -> str:
+    return os.path.join(store_dir, f"project_{project_id}.parquet")
+
+
+def _compact(mapping_df: pd.DataFrame) -> pd.DataFrame:
+    """Columnar-friendly dtypes: categoricals, float32 scores, int32 row numbers."""
+    compact = {}
+    for column, values in mapping_df.items():
+        if column in CATEGORICAL_COLUMNS:
+            compact[column] = values.astype("category")
+        elif column == "Confidence_Score":
+            compact[column] = values.astype(np.float32)
+        elif column == "S.No":
+            compact[column] = values.astype(np.int32)
+        elif column == "Original_Ledger_Name":
+            # Ledger names can be read as numbers; keep the column a single type
+            compact[column] = values.astype(str)
+        else:
+            # Amounts stay float64 so totals reconcile to the paisa
+            compact[column] = values
+    return pd.DataFrame(compact)
+
+
+def save_ledger_mapping(project_id: int, mapping_df: pd.DataFrame, metadata: Dict,
+                        store_dir: str = LEDGER_STORE_DIR):
+    """
+    Store a project's mapping result, replacing any earlier one.
+
+    Parameters:
+    -----------
+    mapping_df : pd.DataFrame
+        process_trial_balance output for the project's trial balance
+    metadata : dict
+        JSON-serializable details kept with the mapping, e.g. mapper
+        cache_version, threshold and {pbc_category: item_number}
+    """
+    table = pa.Table.from_pandas(_compact(mapping_df), preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        METADATA_KEY: json.dumps(metadata).encode('utf-8')
+    })
+
+    os.makedirs(store_dir, exist_ok=True)
+    path = _store_path(project_id, store_dir)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def has_ledger_mapping(project_id: int, store_dir: str = LEDGER_STORE_DIR) -> bool:
+    return os.path.exists(_store_path(project_id, store_dir))
+
+
+def load_ledger_metadata(project_id: int, store_dir: str = LEDGER_STORE_DIR) -> Dict:
+    """Metadata stored with a project's mapping, read from the file footer only."""
+    path = _store_path(project_id, store_dir)
+    if not os.path.exists(path):
+        return {}
+    schema = pq.read_schema(path)
+    return json.loads((schema.metadata or {}).get(METADATA_KEY, b"{}"))
+
+
+def load_ledger_mapping(project_id: int, columns: Optional[List[str]] = None,
+                        pbc_category: Optional[str] = None,
+                        store_dir: str = LEDGER_STORE_DIR) -> Tuple[Optional[pd.DataFrame], Dict]:
+    """
+    Return (mapping_df, metadata), or (None, {}) if the project has no stored mapping.
+
+    Parameters:
+    -----------
+    columns : list of str, optional
+        Load only these columns; the rest are never read from disk
+    pbc_category : str, optional
+        Load only the ledgers mapped to this PBC category
+    """
+    path = _store_path(project_id, store_dir)
+    if not os.path.exists(path):
+        return None, {}
+
+    filters = [("PBC_Category", "==", pbc_category)] if pbc_category is not None else None
+    table = pq.read_table(path, columns=columns, filters=filters)
+    metadata = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+    return table.to_pandas(), metadata
@@ -6,7 +6,13 @@ from datetime import datetime, timedelta
 from database import *
 from gemini_ai import *
 from utils import *
-from tb_mapper import TrialBalanceToPBCMapper  # Import the mapper
+from tb_mapper import TrialBalanceToPBCMapper, get_shared_mapper  # Import the mapper
+from mapping_cache import MappingCache
+from ledger_store import save_ledger_mapping, load_ledger_mapping, has_ledger_mapping
+from upload_cache import UploadCache, hash_upload
+from tb_ingest import INGEST_VERSION, read_trial_balance
+from tb_validation import validate_trial_balance
+from pbc_builder import build_pbc_items
 import io
 import json
 from io import BytesIO
@@ -14,6 +20,21 @@ from io import BytesIO
 # Initialize database
 init_database()
 
+@st.cache_resource
+def get_mapping_cache():
+    """Ledger mapping cache shared by all sessions on this server."""
+    return MappingCache("mapping_cache.db")
+
+@st.cache_resource
+def get_tb_mapper(audit_type: str, accounting_standard: str) -> TrialBalanceToPBCMapper:
+    """Compiled mapper shared by all sessions, built once per server process."""
+    return get_shared_mapper(audit_type, accounting_standard, cache=get_mapping_cache())
+
+@st.cache_resource
+def get_upload_cache():
+    """Parsed uploads and their scoring results, shared by all sessions on this server."""
+    return UploadCache()
+
 # Page config
 st.set_page_config(
     page_title="Smart Audit Room - PBC Automator",
@@ -308,45 +329,47 @@ def show_signup_page():
                 elif not is_ca and not company_name:
                     st.error("❌ Please provide company name")
                 else:
-                    # Create account
-                    db = get_session()
+                    # Create account; bcrypt runs here, not on the writer thread
+                    password_hash = hash_password(password)
+                    invite_code = generate_invite_code() if is_ca else None
+                    
+                    def create_account(db):
+                        # Check if email exists (inside the write, so two signups cannot both pass)
+                        if db.query(User).filter(User.email == email.lower()).first():
+                            return False
+                        
+                        # Create user
+                        new_user = User(
+                            email=email.lower(),
+                            password_hash=password_hash,
+                            full_name=full_name,
+                            role=UserRole.CA if is_ca else UserRole.CLIENT,
+                            company_name=company_name if not is_ca else firm_name
+                        )
+                        db.add(new_user)
+                        db.flush()
+                        
+                        # Create profile
+                        if is_ca:
+                            db.add(CAProfile(
+                                user_id=new_user.user_id,
+                                firm_name=firm_name,
+                                membership_no=membership_no,
+                                firm_registration_no=firm_registration_no if firm_registration_no else None,
+                                invite_code=invite_code
+                            ))
+                        else:
+                            db.add(ClientProfile(
+                                user_id=new_user.user_id,
+                                company_name=company_name,
+                                gstin=gstin if gstin else None
+                            ))
+                        return True
+                    
                     try:
-                        # Check if email exists
-                        existing = db.query(User).filter(User.email == email.lower()).first()
-                        if existing:
+                        if not run_write(create_account):
                             st.error("❌ Email already registered. Please sign in.")
                         else:
-                            # Create user
-                            new_user = User(
-                                email=email.lower(),
-                                password_hash=hash_password(password),
-                                full_name=full_name,
-                                role=UserRole.CA if is_ca else UserRole.CLIENT,
-                                company_name=company_name if not is_ca else firm_name
-                            )
-                            db.add(new_user)
-                            db.flush()
-                            
-                            # Create profile
-                            if is_ca:
-                                ca_profile = CAProfile(
-                                    user_id=new_user.user_id,
-                                    firm_name=firm_name,
-                                    membership_no=membership_no,
-                                    firm_registration_no=firm_registration_no if firm_registration_no else None,
-                                    invite_code=generate_invite_code()
-                                )
-                                db.add(ca_profile)
-                            else:
-                                client_profile = ClientProfile(
-                                    user_id=new_user.user_id,
-                                    company_name=company_name,
-                                    gstin=gstin if gstin else None
-                                )
-                                db.add(client_profile)
-                            
-                            db.commit()
-                            
                             st.success("✅ Account created successfully!")
                             st.balloons()
                             st.info("Redirecting to sign in...")
@@ -357,10 +380,7 @@ def show_signup_page():
                             st.rerun()
                     
                     except Exception as e:
-                        db.rollback()
                         st.error(f"❌ Error: {str(e)}")
-                    finally:
-                        db.close()
         
         st.markdown("<br>", unsafe_allow_html=True)
         col_back1, col_back2 = st.columns(2)
@@ -399,29 +419,27 @@ def show_signin_page():
                 if not email or not password:
                     st.error("❌ Please enter both email and password")
                 else:
-                    db = get_session()
-                    try:
-                        user = db.query(User).filter(User.email == email.lower()).first()
-                        
-                        if not user:
-                            st.error("❌ Account not found. Please sign up first.")
-                        elif not verify_password(password, user.password_hash):
-                            st.error("❌ Incorrect password")
-                        elif not user.is_active:
-                            st.error("❌ Account is deactivated. Contact support.")
-                        else:
-                            # Successful login
-                            login_user(user.user_id, user.role.value)
-                            st.success(f"✅ Welcome back, {user.full_name}!")
-                            
-                            import time
-                            time.sleep(1)
-                            st.rerun()
-                    
-                    except Exception as e:
-                        st.error(f"❌ Login error: {str(e)}")
-                    finally:
-                        db.close()
+                    with session_scope() as db:
+                        try:
+                            user = db.query(User).filter(User.email == email.lower()).first()
+
+                            if not user:
+                                st.error("❌ Account not found. Please sign up first.")
+                            elif not verify_password(password, user.password_hash):
+                                st.error("❌ Incorrect password")
+                            elif not user.is_active:
+                                st.error("❌ Account is deactivated. Contact support.")
+                            else:
+                                # Successful login
+                                login_user(user.user_id, user.role.value)
+                                st.success(f"✅ Welcome back, {user.full_name}!")
+
+                                import time
+                                time.sleep(1)
+                                st.rerun()
+
+                        except Exception as e:
+                            st.error(f"❌ Login error: {str(e)}")
         
         st.markdown("<br>", unsafe_allow_html=True)
         col_back1, col_back2 = st.columns(2)
@@ -441,56 +459,53 @@ def show_signin_page():
 # ============================================================================
 
 def show_ca_dashboard():
-    db = get_session()
-    
-    # Get CA profile
-    user = db.query(User).filter(User.user_id == st.session_state.user_id).first()
-    ca_profile = db.query(CAProfile).filter(CAProfile.user_id == st.session_state.user_id).first()
-    
-    if not ca_profile:
-        st.error("CA Profile not found")
-        db.close()
-        return
-    
-    # Sidebar
-    with st.sidebar:
-        st.markdown(f"<h3 style='color: #E2E8F0;'>👨‍💼 {user.full_name}</h3>", unsafe_allow_html=True)
-        st.markdown(f"<p style='color: #E2E8F0; font-weight: 700; font-size: 16px;'>{ca_profile.firm_name}</p>", unsafe_allow_html=True)
-        st.markdown(f"**ICAI Membership:** {ca_profile.membership_no}")
-        if hasattr(ca_profile, 'firm_registration_no') and ca_profile.firm_registration_no:
-            st.markdown(f"**Firm Registration:** {ca_profile.firm_registration_no}")
-        
-        # Invite Code in sidebar
-        with st.expander("🔗 Your Invite Code"):
-            st.code(ca_profile.invite_code, language=None)
-            if st.button("📋 Copy Code", key="copy_invite_sidebar", use_container_width=True):
-                st.toast("✅ Copied to clipboard!")
-        
-        st.divider()
-        
-        menu = st.radio(
-            "Navigation",
-            ["📊 Dashboard", "📁 Projects", "➕ New Project", "👥 My Clients", "⚙️ Settings"],
-            label_visibility="collapsed"
-        )
-            
-        st.divider()
-        if st.button("🚪 Logout", use_container_width=True):
-            logout_user()
-    
-    # Main content based on menu
-    if menu == "📊 Dashboard":
-        show_ca_dashboard_home(db, ca_profile)
-    elif menu == "📁 Projects":
-        show_ca_projects(db, ca_profile)
-    elif menu == "➕ New Project":
-        show_ca_new_project(db, ca_profile)
-    elif menu == "👥 My Clients":
-        show_ca_clients(db, ca_profile)
-    elif menu == "⚙️ Settings":
-        show_ca_settings(db, ca_profile)
-    
-    db.close()
+    with session_scope() as db:
+
+        # Get CA profile
+        user = db.query(User).filter(User.user_id == st.session_state.user_id).first()
+        ca_profile = db.query(CAProfile).filter(CAProfile.user_id == st.session_state.user_id).first()
+
+        if not ca_profile:
+            st.error("CA Profile not found")
+            return
+
+        # Sidebar
+        with st.sidebar:
+            st.markdown(f"<h3 style='color: #E2E8F0;'>👨‍💼 {user.full_name}</h3>", unsafe_allow_html=True)
+            st.markdown(f"<p style='color: #E2E8F0; font-weight: 700; font-size: 16px;'>{ca_profile.firm_name}</p>", unsafe_allow_html=True)
+            st.markdown(f"**ICAI Membership:** {ca_profile.membership_no}")
+            if hasattr(ca_profile, 'firm_registration_no') and ca_profile.firm_registration_no:
+                st.markdown(f"**Firm Registration:** {ca_profile.firm_registration_no}")
+
+            # Invite Code in sidebar
+            with st.expander("🔗 Your Invite Code"):
+                st.code(ca_profile.invite_code, language=None)
+                if st.button("📋 Copy Code", key="copy_invite_sidebar", use_container_width=True):
+                    st.toast("✅ Copied to clipboard!")
+
+            st.divider()
+
+            menu = st.radio(
+                "Navigation",
+                ["📊 Dashboard", "📁 Projects", "➕ New Project", "👥 My Clients", "⚙️ Settings"],
+                label_visibility="collapsed"
+            )
+
+            st.divider()
+            if st.button("🚪 Logout", use_container_width=True):
+                logout_user()
+
+        # Main content based on menu
+        if menu == "📊 Dashboard":
+            show_ca_dashboard_home(db, ca_profile)
+        elif menu == "📁 Projects":
+            show_ca_projects(db, ca_profile)
+        elif menu == "➕ New Project":
+            show_ca_new_project(db, ca_profile)
+        elif menu == "👥 My Clients":
+            show_ca_clients(db, ca_profile)
+        elif menu == "⚙️ Settings":
+            show_ca_settings(db, ca_profile)
 
 def show_ca_dashboard_home(db, ca_profile):
     st.markdown('<div class="main-card">', unsafe_allow_html=True)
@@ -637,10 +652,151 @@ def show_ca_projects(db, ca_profile):
                     st.session_state.selected_project = project.project_id
                     st.rerun()
             
+            if has_ledger_mapping(project.project_id) and st.toggle("📒 Show ledger mapping", key=f"ledgers_{project.project_id}"):
+                # Only the columns shown are read from the project's store
+                ledger_df, _ = load_ledger_mapping(
+                    project.project_id,
+                    columns=['Original_Ledger_Name', 'PBC_Category', 'Confidence_Score', 'Debit_Amount', 'Credit_Amount']
+                )
+                category_totals = ledger_df.groupby('PBC_Category', observed=True)[['Debit_Amount', 'Credit_Amount']].sum()
+                st.dataframe(category_totals, use_container_width=True)
+                st.download_button(
+                    label="📥 Ledger Mapping (CSV)",
+                    data=ledger_df.to_csv(index=False),
+                    file_name=f"ledger_mapping_{project.project_id}.csv",
+                    mime="text/csv",
+                    key=f"ledger_export_{project.project_id}"
+                )
+            
+            with st.expander("🔄 Upload Revised Trial Balance"):
+                revised_file = st.file_uploader(
+                    "Revised Trial Balance (Excel/CSV/Tally XML)",
+                    type=['xlsx', 'xls', 'csv', 'xml'],
+                    key=f"revised_tb_{project.project_id}"
+                )
+                if st.button("Apply Revision", key=f"revise_{project.project_id}", disabled=revised_file is None):
+                    show_trial_balance_revision(db, project, revised_file)
+            
             st.markdown("<br>", unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+def show_trial_balance_revision(db, project, tb_file):
+    """Remap only what changed in a revised TB and update the affected PBC items."""
+    previous, metadata = load_ledger_mapping(project.project_id)
+    if previous is None:
+        st.warning("⚠️ No ledger-level mapping is stored for this project, so it cannot be revised incrementally.")
+        return
+    
+    try:
+        _, tb_df = load_trial_balance_upload(tb_file)
+        required_cols = ['Account Name', 'Debit', 'Credit']
+        if not all(col in tb_df.columns for col in required_cols):
+            st.error(f"❌ Trial Balance must have columns: {', '.join(required_cols)}")
+            return
+        show_validation_report(validate_trial_balance(tb_df))
+        
+        mapper_audit_type = metadata.get('audit_type', "Tax" if project.audit_type == "Tax Audit" else "Stat")
+        accounting_std = metadata.get('accounting_standard', "Indian GAAP")
+        threshold = metadata.get('threshold', 60)
+        mapper = get_tb_mapper(mapper_audit_type, accounting_std)
+        
+        with st.spinner("🤖 Comparing with the previous Trial Balance..."):
+            mapping_result, changes = mapper.revise_trial_balance(
+                previous,
+                tb_df,
+                ledger_column='Account Name',
+                debit_column='Debit',
+                credit_column='Credit',
+                threshold=threshold,
+                # Mappings made with another dictionary or scorer version are not reused
+                remap_all=metadata.get('cache_version') != mapper.cache_version,
+                # Tally XML: the parent-group signal used when the project was mapped
+                group_column='Parent Group' if 'Parent Group' in tb_df.columns else None
+            )
+            
+            # Totals and descriptions for every category in one pass; only affected ones are written
+            category_items = build_pbc_items(mapping_result).set_index('PBC_Category')
+            project_id = project.project_id
+            
+            def apply_revision(db):
+                # Update only the PBC items whose ledgers or totals changed
+                pbc_item_numbers = dict(metadata.get('pbc_items', {}))
+                items = {item.item_number: item for item in
+                         db.query(PBCItem).filter(PBCItem.project_id == project_id).all()}
+                next_item_number = max(items, default=0) + 1
+                updated_items, new_items, emptied = 0, 0, []
+                
+                for pbc_category in changes['affected_categories']:
+                    if pbc_category not in category_items.index:
+                        # Keep the item (it may already have documents), but report it
+                        emptied.append(pbc_category)
+                        continue
+                    category_item = category_items.loc[pbc_category]
+                    
+                    pbc_item = items.get(pbc_item_numbers.get(pbc_category))
+                    if pbc_item is not None:
+                        pbc_item.item_description = category_item['Item_Description']
+                        pbc_item.priority = category_item['Priority']
+                        updated_items += 1
+                    else:
+                        db.add(PBCItem(
+                            project_id=project_id,
+                            item_number=next_item_number,
+                            category=category_item['Category'],
+                            item_description=category_item['Item_Description'],
+                            why_needed=category_item['Why_Needed'],
+                            priority=category_item['Priority'],
+                            status=PBCStatus.PENDING,
+                            ai_generated=True
+                        ))
+                        pbc_item_numbers[pbc_category] = next_item_number
+                        next_item_number += 1
+                        new_items += 1
+                
+                tb_record = db.query(TrialBalance).filter(TrialBalance.project_id == project_id).first()
+                if tb_record is not None:
+                    tb_record.filename = tb_file.name
+                    tb_record.uploaded_at = datetime.utcnow()
+                    tb_record.total_debit = float(tb_df['Debit'].sum())
+                    tb_record.total_credit = float(tb_df['Credit'].sum())
+                    tb_record.account_count = len(tb_df)
+                return pbc_item_numbers, updated_items, new_items, emptied
+            
+            pbc_item_numbers, updated_items, new_items, emptied = run_write(apply_revision)
+            # The rest of this page re-reads what the writer committed
+            db.expire_all()
+            save_ledger_mapping(project.project_id, mapping_result, {
+                **metadata,
+                'cache_version': mapper.cache_version,
+                'pbc_items': pbc_item_numbers
+            })
+        
+        st.success(f"✅ Revision applied in {changes['seconds']}s ({changes['remapped']} ledgers remapped)")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("Unchanged", changes['unchanged'])
+        with col2:
+            st.metric("Amount Changed", len(changes['amount_changed']))
+        with col3:
+            st.metric("Added", len(changes['added']))
+        with col4:
+            st.metric("Removed", len(changes['removed']))
+        with col5:
+            st.metric("Renamed", len(changes['renamed']))
+        
+        st.info(f"✓ {updated_items} PBC items updated | {new_items} new PBC items")
+        if emptied:
+            st.warning(f"⚠️ No ledgers left for: {', '.join(emptied)}. Their PBC items were kept for review.")
+        if changes['renamed']:
+            with st.expander("✏️ Renamed ledgers"):
+                st.dataframe(pd.DataFrame(changes['renamed'], columns=['Previous Name', 'New Name']),
+                             use_container_width=True, hide_index=True)
+    
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
+
+
 def show_ca_new_project(db, ca_profile):
     st.markdown('<div class="main-card">', unsafe_allow_html=True)
     
@@ -716,109 +872,127 @@ def show_ca_new_project(db, ca_profile):
                 pass
         
         tb_file = st.file_uploader(
-            "Trial Balance (Excel/CSV)",
-            type=['xlsx', 'xls', 'csv'],
-            help="Upload Trial Balance with columns: Account Name, Debit, Credit"
+            "Trial Balance (Excel/CSV/Tally XML)",
+            type=['xlsx', 'xls', 'csv', 'xml'],
+            help="Upload Trial Balance with columns: Account Name, Debit, Credit. Tally/Busy exports "
+                 "(Particulars, Closing Dr/Cr or Closing Balance) are detected automatically, and a Tally XML "
+                 "export's parent groups are used to help map ledgers"
+        )
+        
+        create_anyway = st.checkbox(
+            "Create the project even if the Trial Balance has validation errors",
+            help="By default a Trial Balance that does not balance or has non-numeric amounts is not turned into a project"
         )
         
         st.markdown("<br>", unsafe_allow_html=True)
-        submit = st.form_submit_button("🚀 Create Project & Generate PBC", use_container_width=True)
+        col_preview, col_submit = st.columns(2)
+        with col_preview:
+            preview = st.form_submit_button("🔍 Preview Mapping", use_container_width=True)
+        with col_submit:
+            submit = st.form_submit_button("🚀 Create Project & Generate PBC", use_container_width=True)
+        
+        mapper_audit_type = "Tax" if audit_type == "Tax Audit" else "Stat"
+        threshold = st.session_state.get('mapping_threshold', 60)
+        
+        if preview:
+            if not tb_file:
+                st.error("❌ Please upload Trial Balance to preview the mapping")
+            else:
+                try:
+                    upload_digest, tb_df = load_trial_balance_upload(tb_file)
+                    required_cols = ['Account Name', 'Debit', 'Credit']
+                    if not all(col in tb_df.columns for col in required_cols):
+                        st.error(f"❌ Trial Balance must have columns: {', '.join(required_cols)}")
+                    else:
+                        with st.spinner("🤖 Scoring ledgers..."):
+                            mapper = get_tb_mapper(mapper_audit_type, accounting_std)
+                            st.session_state.tb_preview = {
+                                'file_name': tb_file.name,
+                                'layout': tb_df.attrs.get('layout'),
+                                'validation': validate_trial_balance(tb_df),
+                                'scored': score_trial_balance_upload(mapper, upload_digest, tb_df)
+                            }
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
         
         if submit:
             if not all([project_name, financial_year, tb_file]):
                 st.error("❌ Please fill all required fields and upload Trial Balance")
             else:
                 try:
-                    # Read Trial Balance
-                    if tb_file.name.endswith('.csv'):
-                        tb_df = pd.read_csv(tb_file)
-                    else:
-                        tb_df = pd.read_excel(tb_file)
+                    # Read Trial Balance (an identical earlier upload is not parsed again)
+                    upload_digest, tb_df = load_trial_balance_upload(tb_file)
                     
                     # Validate columns
                     required_cols = ['Account Name', 'Debit', 'Credit']
-                    if not all(col in tb_df.columns for col in required_cols):
+                    has_columns = all(col in tb_df.columns for col in required_cols)
+                    # Balance, duplicate and amount checks, before the project is created
+                    validation = validate_trial_balance(tb_df) if has_columns else None
+                    if not has_columns:
                         st.error(f"❌ Trial Balance must have columns: {', '.join(required_cols)}")
+                    elif not validation['ok'] and not create_anyway:
+                        # Kept in the session so the report stays on screen, like the preview's
+                        st.session_state.tb_blocked_validation = {'file_name': tb_file.name, 'validation': validation}
+                        st.error("❌ The Trial Balance has errors, so the project was not created. Fix the file, "
+                                 "or tick 'Create the project even if the Trial Balance has validation errors'.")
                     else:
+                        st.session_state.pop('tb_blocked_validation', None)
+                        show_validation_report(validation)
+                        
                         with st.spinner("🤖 Creating project and generating PBC list with AI Mapper..."):
-                            # Create project
-                            new_project = AuditProject(
-                                ca_id=ca_profile.ca_id,
-                                client_id=selected_client_id,
-                                project_name=project_name,
-                                financial_year=financial_year,
-                                audit_type=audit_type,
-                                status="Active"
-                            )
-                            db.add(new_project)
-                            db.flush()
-                            
-                            # Save Trial Balance
-                            tb_record = TrialBalance(
-                                project_id=new_project.project_id,
-                                filename=tb_file.name,
-                                total_debit=float(tb_df['Debit'].sum()),
-                                total_credit=float(tb_df['Credit'].sum()),
-                                account_count=len(tb_df)
-                            )
-                            db.add(tb_record)
-                            
                             # === USE TB MAPPER INSTEAD OF GEMINI ===
-                            # Initialize mapper based on audit type
-                            mapper_audit_type = "Tax" if audit_type == "Tax Audit" else "Stat"
-                            mapper = TrialBalanceToPBCMapper(
-                                audit_type=mapper_audit_type,
-                                accounting_standard=accounting_std
-                            )
+                            # Reuses the preview's (or an identical earlier upload's) scoring pass
+                            mapper = get_tb_mapper(mapper_audit_type, accounting_std)
+                            scored = score_trial_balance_upload(mapper, upload_digest, tb_df)
                             
-                            # Map ledgers to PBC categories
-                            mapping_result = mapper.process_trial_balance(
-                                df=tb_df,
-                                ledger_column='Account Name',
-                                debit_column='Debit',
-                                credit_column='Credit',
-                                threshold=60
-                            )
+                            # Map ledgers to PBC categories at the chosen threshold
+                            mapping_result = scored.at_threshold(threshold)
                             
                             # Get summary
-                            summary = mapper.generate_pbc_summary(mapping_result)
+                            summary = scored.summary(threshold)
                             
-                            # Group by PBC category and create PBC items
-                            pbc_categories = mapping_result[
-                                mapping_result['PBC_Category'] != 'UNMAPPED - Manual Review Required'
-                            ]['PBC_Category'].unique()
+                            # One PBC item per mapped category, built in a single groupby pass
+                            pbc_items = build_pbc_items(mapping_result)
+                            pbc_item_records = pbc_items.to_dict('records')
+                            pbc_item_numbers = dict(zip(pbc_items['PBC_Category'], pbc_items['Item_Number'].tolist()))
                             
-                            pbc_item_number = 1
-                            for pbc_category in pbc_categories:
-                                # Get ledgers in this category
-                                category_ledgers = mapping_result[
-                                    mapping_result['PBC_Category'] == pbc_category
-                                ]
-                                
-                                # Calculate total amounts
-                                total_debit = category_ledgers['Debit_Amount'].sum() if 'Debit_Amount' in category_ledgers.columns else 0
-                                total_credit = category_ledgers['Credit_Amount'].sum() if 'Credit_Amount' in category_ledgers.columns else 0
-                                
-                                # Generate description based on category
-                                description = generate_pbc_description(pbc_category, category_ledgers)
-                                why_needed = generate_why_needed(pbc_category)
-                                priority = determine_priority(pbc_category, total_debit, total_credit)
+                            def create_project(db):
+                                # Create project
+                                new_project = AuditProject(
+                                    ca_id=ca_profile.ca_id,
+                                    client_id=selected_client_id,
+                                    project_name=project_name,
+                                    financial_year=financial_year,
+                                    audit_type=audit_type,
+                                    status="Active"
+                                )
+                                db.add(new_project)
+                                db.flush()
                                 
-                                # Create PBC item
-                                pbc_item = PBCItem(
+                                # Save Trial Balance
+                                db.add(TrialBalance(
                                     project_id=new_project.project_id,
-                                    item_number=pbc_item_number,
-                                    category=get_major_category(pbc_category),
-                                    item_description=description,
-                                    why_needed=why_needed,
-                                    priority=priority,
-                                    status=PBCStatus.PENDING,
-                                    ai_generated=True
-                                )
-                                db.add(pbc_item)
-                                pbc_item_number += 1
+                                    filename=tb_file.name,
+                                    total_debit=float(tb_df['Debit'].sum()),
+                                    total_credit=float(tb_df['Credit'].sum()),
+                                    account_count=len(tb_df)
+                                ))
+                                
+                                # One executemany INSERT in this transaction instead of an ORM object per item
+                                insert_stats = bulk_insert_pbc_items(db, new_project.project_id, pbc_item_records)
+                                return new_project.project_id, insert_stats
                             
-                            db.commit()
+                            # Project, TB and items commit together on the writer
+                            new_project_id, insert_stats = run_write(create_project)
+                            
+                            # Keep the ledger-level mapping for revisions of this TB
+                            save_ledger_mapping(new_project_id, mapping_result, {
+                                'cache_version': get_tb_mapper(mapper_audit_type, accounting_std).cache_version,
+                                'audit_type': mapper_audit_type,
+                                'accounting_standard': accounting_std,
+                                'threshold': threshold,
+                                'pbc_items': pbc_item_numbers
+                            })
                             
                             # Show success with summary
                             st.success(f"✅ Project created successfully!")
@@ -829,128 +1003,154 @@ def show_ca_new_project(db, ca_profile):
                             with col1:
                                 st.metric("Total Ledgers", summary['total_ledgers'])
                             with col2:
-                                st.metric("PBC Items Generated", len(pbc_categories))
+                                st.metric("PBC Items Generated", len(pbc_items))
                             with col3:
                                 st.metric("Success Rate", f"{summary['success_rate']}%")
                             
                             st.info(f"✓ {summary['high_confidence']} High Confidence | {summary['medium_confidence']} Medium | {summary['low_confidence']} Need Review")
                             
+                            st.caption(f"💾 {insert_stats['rows']} PBC items saved in {insert_stats['seconds']}s")
+                            
+                            cache_stats = mapping_result.attrs.get('cache_stats', {})
+                            if cache_stats.get('hits'):
+                                st.caption(f"⚡ {cache_stats['hits']} of {cache_stats['hits'] + cache_stats['misses']} unique ledgers served from mapping cache")
+                            
                             import time
                             time.sleep(3)
-                            st.session_state.selected_project = new_project.project_id
+                            st.session_state.pop('tb_preview', None)
+                            st.session_state.selected_project = new_project_id
                             st.rerun()
                 
                 except Exception as e:
-                    db.rollback()
                     st.error(f"❌ Error: {str(e)}")
                     import traceback
                     st.error(traceback.format_exc())
     
+    # Validation errors that stopped the last submit
+    blocked = st.session_state.get('tb_blocked_validation')
+    tb_preview = st.session_state.get('tb_preview')
+    if blocked and not (tb_preview and tb_preview['file_name'] == blocked['file_name']):
+        st.markdown("### 🧾 Trial Balance Checks")
+        st.caption(f"{blocked['file_name']} was not turned into a project because of the errors below.")
+        show_validation_report(blocked['validation'])
+    
+    # Threshold what-if: re-derives the mapping from the preview's scores, no rescoring
+    st.markdown("### 🎚️ Mapping Threshold")
+    threshold = st.slider(
+        "Minimum confidence score to auto-map a ledger",
+        min_value=30, max_value=90, value=60, step=5,
+        key="mapping_threshold",
+        help="Ledgers scoring below this are left for manual review"
+    )
+    
+    if tb_preview:
+        scored = tb_preview['scored']
+        preview_summary = scored.summary(threshold)
+        unmapped = scored.unmapped_count(threshold)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Mapped Ledgers", len(scored) - unmapped)
+        with col2:
+            st.metric("Unmapped Ledgers", unmapped)
+        with col3:
+            st.metric("Success Rate", f"{preview_summary['success_rate']}%")
+        with col4:
+            st.metric("PBC Items", scored.mapped_category_count(threshold))
+        st.caption(f"Preview of {tb_preview['file_name']}. Move the slider to compare thresholds, then create the project.")
+        if tb_preview.get('layout'):
+            st.caption(f"Detected {tb_preview['layout']}.")
+        if tb_preview.get('validation'):
+            show_validation_report(tb_preview['validation'])
+        
+        if unmapped:
+            with st.expander(f"🔎 Review {unmapped} unmapped ledgers with suggested categories"):
+                review_df = scored.at_threshold(threshold, include_candidates=True)
+                review_df = review_df[review_df['PBC_Category'] == 'UNMAPPED - Manual Review Required']
+                candidate_cols = [col for col in review_df.columns if col.startswith('Top_')]
+                st.dataframe(
+                    review_df.drop_duplicates('Original_Ledger_Name')[['Original_Ledger_Name'] + candidate_cols],
+                    use_container_width=True,
+                    hide_index=True
+                )
+    else:
+        st.caption("Click 🔍 Preview Mapping to see how many ledgers map at each threshold.")
+    
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def generate_pbc_description(pbc_category: str, ledgers_df: pd.DataFrame) -> str:
-    """Generate PBC description based on category and ledgers"""
-    
-    ledger_names = ", ".join(ledgers_df['Original_Ledger_Name'].head(3).tolist())
-    if len(ledgers_df) > 3:
-        ledger_names += f" and {len(ledgers_df) - 3} more"
-    
-    category_descriptions = {
-        "Fixed Assets": f"Fixed asset register with details of {ledger_names}. Include purchase invoices, depreciation schedule, and disposal records.",
-        "Bank": f"Bank statements and reconciliations for {ledger_names}. Include bank confirmation letters.",
-        "Cash": "Cash book, petty cash records, and cash count certificates as on year-end.",
-        "Inventories": f"Stock statement with valuation details for {ledger_names}. Include physical verification reports.",
-        "Trade Receivables": f"Debtors list with ageing for {ledger_names}. Include confirmation letters and subsequent collection details.",
-        "Trade Payables": f"Creditors list with ageing for {ledger_names}. Include confirmation letters and MSME classification.",
-        "Loans": f"Loan agreements, sanction letters, and repayment schedules for {ledger_names}.",
-        "GST": "GST returns (GSTR-1, GSTR-3B), GST reconciliation, and ITC working papers.",
-        "Sales": "Sales register, invoices, and supporting documents. Include GST reconciliation.",
-        "Expenses": f"Expense vouchers and supporting documents for {ledger_names}.",
-        "Salary": "Salary sheets, PF/ESI challans, and Form 16 for employees.",
-    }
-    
-    # Match category to description
-    for key, desc in category_descriptions.items():
-        if key.lower() in pbc_category.lower():
-            return desc
-    
-    # Default description
-    return f"Supporting documents and schedules for {pbc_category}. Includes ledger extracts and vouchers."
+def show_validation_report(report: dict):
+    """Show the Trial Balance validation report: totals, then each issue found."""
+    if not report['issues']:
+        st.success(f"✅ Trial Balance balances: Debit ₹{report['total_debit']:,.2f} = "
+                   f"Credit ₹{report['total_credit']:,.2f} across {report['rows']} ledgers")
+        return
+    
+    for severity, message in report['issues']:
+        if severity == "error":
+            st.error(f"❌ {message}")
+        else:
+            st.warning(f"⚠️ {message}")
+    
+    with st.expander("📋 Validation details"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Debit", f"₹{report['total_debit']:,.2f}")
+        with col2:
+            st.metric("Total Credit", f"₹{report['total_credit']:,.2f}")
+        with col3:
+            st.metric("Difference", f"₹{report['difference']:,.2f}")
+        
+        if report['duplicate_ledgers']['count']:
+            st.write("**Duplicate ledgers:** " + ", ".join(report['duplicate_ledgers']['ledgers']))
+        for check, label in (('both_debit_and_credit', "Rows with both Debit and Credit"),
+                             ('negative_amounts', "Rows with negative amounts"),
+                             ('blank_ledger_names', "Rows without a ledger name"),
+                             ('missing_amounts', "Ledgers without amounts"),
+                             ('ragged_rows', "Rows with a different number of fields")):
+            if report[check]['count']:
+                st.write(f"**{label}:** " + ", ".join(str(row) for row in report[check]['rows']))
+        for column, rows in report['non_numeric']['columns'].items():
+            st.write(f"**Non-numeric cells in {column}:** rows " + ", ".join(str(row) for row in rows))
 
 
-def generate_why_needed(pbc_category: str) -> str:
-    """Generate why needed explanation"""
-    
-    explanations = {
-        "Fixed Assets": "To verify existence, ownership, valuation and completeness of fixed assets as per AS-10/Ind AS 16",
-        "Bank": "To confirm existence and accuracy of bank balances and reconcile book balances with bank statements",
-        "Cash": "To verify existence of cash and ensure proper controls over cash handling",
-        "Inventories": "To verify existence, ownership, condition and valuation of inventory as per AS-2/Ind AS 2",
-        "Trade Receivables": "To confirm existence, recoverability and completeness of receivables",
-        "Trade Payables": "To verify completeness and accuracy of liabilities and MSME compliance",
-        "Loans": "To verify terms, conditions, repayment schedule and compliance with loan covenants",
-        "GST": "To verify GST compliance and ensure accurate reporting of input and output tax",
-        "Sales": "To verify revenue recognition, cut-off and ensure completeness of sales",
-        "Expenses": "To verify nature, authorization and proper accounting of expenses",
-        "Salary": "To verify employee costs and compliance with statutory requirements",
-    }
-    
-    for key, explanation in explanations.items():
-        if key.lower() in pbc_category.lower():
-            return explanation
-    
-    return f"To verify, validate and ensure proper accounting treatment of {pbc_category}"
+def read_trial_balance_file(tb_file) -> pd.DataFrame:
+    """Read the ledger and amount columns of an uploaded Trial Balance (CSV, Excel or Tally XML)"""
+    tb_file.seek(0)
+    return read_trial_balance(tb_file, filename=tb_file.name)
 
 
-def determine_priority(pbc_category: str, debit: float, credit: float) -> str:
-    """Determine priority based on category and amounts"""
-    
-    amount = max(abs(debit), abs(credit))
-    
-    # High priority categories
-    high_priority = ["bank", "cash", "sales", "revenue", "receivable", "payable", "loan", "borrowing"]
-    if any(hp in pbc_category.lower() for hp in high_priority):
-        return "High"
-    
-    # High priority for large amounts
-    if amount > 1000000:  # > 10 lakhs
-        return "High"
-    
-    # Medium priority
-    if amount > 100000:  # > 1 lakh
-        return "Medium"
-    
-    return "Low"
+def load_trial_balance_upload(tb_file):
+    """
+    Hash an uploaded Trial Balance and return (hash, DataFrame).
+    A file already uploaded before is served from the upload cache instead of parsed again.
+    """
+    upload_cache = get_upload_cache()
+    upload_digest = hash_upload(tb_file)
+    tb_df = upload_cache.get_frame(upload_digest, INGEST_VERSION)
+    if tb_df is None:
+        tb_df = read_trial_balance_file(tb_file)
+        upload_cache.put_frame(upload_digest, tb_df, INGEST_VERSION)
+    return upload_digest, tb_df
 
 
-def get_major_category(pbc_category: str) -> str:
-    """Get major category for grouping"""
-    
-    category_lower = pbc_category.lower()
-    
-    if any(term in category_lower for term in ['fixed asset', 'intangible', 'capital wip', 'ppe']):
-        return 'Fixed Assets'
-    elif 'inventor' in category_lower or any(term in category_lower for term in ['raw material', 'wip', 'finished', 'stock']):
-        return 'Inventories'
-    elif 'receivable' in category_lower or 'debtor' in category_lower:
-        return 'Trade Receivables'
-    elif any(term in category_lower for term in ['cash', 'bank']):
-        return 'Cash & Bank'
-    elif 'payable' in category_lower or 'creditor' in category_lower:
-        return 'Trade Payables'
-    elif any(term in category_lower for term in ['share capital', 'equity', 'reserve', 'retained']):
-        return 'Equity'
-    elif 'borrowing' in category_lower or 'loan' in category_lower:
-        return 'Borrowings'
-    elif any(term in category_lower for term in ['gst', 'tds', 'tax']):
-        return 'Statutory Compliance'
-    elif any(term in category_lower for term in ['sales', 'revenue', 'income']):
-        return 'Revenue'
-    elif any(term in category_lower for term in ['expense', 'cost', 'depreciation']):
-        return 'Expenses'
-    else:
-        return 'Other'
+def score_trial_balance_upload(mapper, upload_digest: str, tb_df: pd.DataFrame):
+    """Threshold-independent scoring of an upload, reused when this file was read and scored by the same versions."""
+    upload_cache = get_upload_cache()
+    # The scored result carries the parsed rows, so a reader change must invalidate it too
+    scored_version = f"{INGEST_VERSION}:{mapper.cache_version}"
+    scored = upload_cache.get_scored(upload_digest, scored_version)
+    if scored is None:
+        scored = mapper.score_trial_balance(
+            df=tb_df,
+            ledger_column='Account Name',
+            debit_column='Debit',
+            credit_column='Credit',
+            # Tally XML uploads carry each ledger's parent group
+            group_column='Parent Group' if 'Parent Group' in tb_df.columns else None
+        )
+        upload_cache.put_scored(upload_digest, scored_version, scored)
+    return scored
 
 
 def show_ca_clients(db, ca_profile):
@@ -1017,13 +1217,17 @@ def show_ca_settings(db, ca_profile):
             membership_no = st.text_input("Membership Number", value=ca_profile.membership_no, disabled=True)
             
             if st.form_submit_button("💾 Save Changes"):
+                user_id, ca_id = user.user_id, ca_profile.ca_id
+                
+                def update_profile(db):
+                    db.get(User, user_id).full_name = full_name
+                    db.get(CAProfile, ca_id).firm_name = firm_name
+                
                 try:
-                    user.full_name = full_name
-                    ca_profile.firm_name = firm_name
-                    db.commit()
+                    run_write(update_profile)
+                    db.expire_all()
                     st.success("✅ Profile updated successfully!")
                 except Exception as e:
-                    db.rollback()
                     st.error(f"❌ Error: {str(e)}")
     
     with tab2:
@@ -1041,12 +1245,16 @@ def show_ca_settings(db, ca_profile):
                 elif len(new_password) < 8:
                     st.error("❌ Password must be at least 8 characters")
                 else:
+                    user_id, password_hash = user.user_id, hash_password(new_password)
+                    
+                    def change_password(db):
+                        db.get(User, user_id).password_hash = password_hash
+                    
                     try:
-                        user.password_hash = hash_password(new_password)
-                        db.commit()
+                        run_write(change_password)
+                        db.expire_all()
                         st.success("✅ Password changed successfully!")
                     except Exception as e:
-                        db.rollback()
                         st.error(f"❌ Error: {str(e)}")
     
     st.markdown("</div>", unsafe_allow_html=True)
@@ -1056,53 +1264,49 @@ def show_ca_settings(db, ca_profile):
 # ============================================================================
 
 def show_client_dashboard():
-    db = get_session()
-    
-    # Get client profile
-    user = db.query(User).filter(User.user_id == st.session_state.user_id).first()
-    client_profile = db.query(ClientProfile).filter(ClientProfile.user_id == st.session_state.user_id).first()
-    
-    if not client_profile:
-        st.error("Client Profile not found")
-        db.close()
-        return
-    
-    # Check if linked to CA
-    if not client_profile.ca_id:
-        show_client_onboarding(db, client_profile)
-        db.close()
-        return
-    
-    # Sidebar
-    with st.sidebar:
-        st.markdown(f"### 🏢 {client_profile.company_name}")
-        st.markdown(f"**{user.full_name}**")
-        
-        ca = db.query(CAProfile).filter(CAProfile.ca_id == client_profile.ca_id).first()
-        if ca:
-            st.markdown(f"**CA Firm:** {ca.firm_name}")
-        
-        st.divider()
-        
-        menu = st.radio(
-            "Navigation",
-            ["📊 Dashboard", "📋 My PBC Lists", "⚙️ Settings"],
-            label_visibility="collapsed"
-        )
-        
-        st.divider()
-        if st.button("🚪 Logout", use_container_width=True):
-            logout_user()
-    
-    # Main content
-    if menu == "📊 Dashboard":
-        show_client_dashboard_home(db, client_profile)
-    elif menu == "📋 My PBC Lists":
-        show_client_pbc_lists(db, client_profile)
-    elif menu == "⚙️ Settings":
-        show_client_settings(db, client_profile)
-    
-    db.close()
+    with session_scope() as db:
+
+        # Get client profile
+        user = db.query(User).filter(User.user_id == st.session_state.user_id).first()
+        client_profile = db.query(ClientProfile).filter(ClientProfile.user_id == st.session_state.user_id).first()
+
+        if not client_profile:
+            st.error("Client Profile not found")
+            return
+
+        # Check if linked to CA
+        if not client_profile.ca_id:
+            show_client_onboarding(db, client_profile)
+            return
+
+        # Sidebar
+        with st.sidebar:
+            st.markdown(f"### 🏢 {client_profile.company_name}")
+            st.markdown(f"**{user.full_name}**")
+
+            ca = db.query(CAProfile).filter(CAProfile.ca_id == client_profile.ca_id).first()
+            if ca:
+                st.markdown(f"**CA Firm:** {ca.firm_name}")
+
+            st.divider()
+
+            menu = st.radio(
+                "Navigation",
+                ["📊 Dashboard", "📋 My PBC Lists", "⚙️ Settings"],
+                label_visibility="collapsed"
+            )
+
+            st.divider()
+            if st.button("🚪 Logout", use_container_width=True):
+                logout_user()
+
+        # Main content
+        if menu == "📊 Dashboard":
+            show_client_dashboard_home(db, client_profile)
+        elif menu == "📋 My PBC Lists":
+            show_client_pbc_lists(db, client_profile)
+        elif menu == "⚙️ Settings":
+            show_client_settings(db, client_profile)
 
 
 # [Keep all other existing client functions unchanged]
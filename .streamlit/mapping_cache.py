@@ -0,0 +1,153 @@
+"""
+Ledger Mapping Cache
+Memoizes ledger scoring results across trial balances and sessions.
+An in-process LRU tier sits in front of an on-disk SQLite tier.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (normalized ledger name, scorer/keyword dictionary version)
+CacheKey = Tuple[str, str]
+
+
+class MappingCache:
+    """
+    Two-tier cache for ledger score records.
+
+    Keys are (normalized ledger name, version), where the version hashes the
+    keyword dictionary and scorer, so any change to either invalidates earlier
+    entries automatically. Records are threshold-independent, so one entry
+    serves every threshold. The SQLite file is shared by every Streamlit
+    session on the server.
+    """
+
+    def __init__(self, db_path: Optional[str] = "mapping_cache.db", max_entries: int = 50000):
+        """
+        Parameters:
+        -----------
+        db_path : str or None
+            SQLite file for the persistent tier; None keeps the cache in memory only
+        max_entries : int
+            Capacity of the in-process LRU tier
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[CacheKey, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ledger_score_cache (
+                    version TEXT NOT NULL,
+                    ledger_normalized TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (version, ledger_normalized)
+                )
+            """)
+            self._conn.commit()
+
+    def _remember(self, key: CacheKey, value: Dict):
+        """Insert into the LRU tier, evicting the oldest entry when full."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, Dict]:
+        """Look up many keys; returns only the ones found in either tier."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[CacheKey, Dict] = {}
+
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            if missing and self._conn is not None:
+                # Group by version so each query can use the primary key
+                groups: Dict[str, List[str]] = {}
+                for ledger_normalized, version in missing:
+                    groups.setdefault(version, []).append(ledger_normalized)
+
+                for version, names in groups.items():
+                    for start in range(0, len(names), 500):
+                        chunk = names[start:start + 500]
+                        placeholders = ",".join("?" * len(chunk))
+                        rows = self._conn.execute(
+                            f"SELECT ledger_normalized, result FROM ledger_score_cache "
+                            f"WHERE version = ? AND ledger_normalized IN ({placeholders})",
+                            [version, *chunk]
+                        ).fetchall()
+                        for ledger_normalized, result in rows:
+                            key = (ledger_normalized, version)
+                            found[key] = json.loads(result)
+                            self._remember(key, found[key])
+                            self.disk_hits += 1
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def get(self, key: CacheKey) -> Optional[Dict]:
+        """Look up a single key."""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[CacheKey, Dict]):
+        """Store results in both tiers."""
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ledger_score_cache "
+                    "(version, ledger_normalized, result) VALUES (?, ?, ?)",
+                    [(version, ledger_normalized, json.dumps(value))
+                     for (ledger_normalized, version), value in items.items()]
+                )
+                self._conn.commit()
+
+    def put(self, key: CacheKey, value: Dict):
+        """Store a single result."""
+        self.put_many({key: value})
+
+    def stats(self) -> Dict:
+        """Hit/miss counters since creation or the last reset."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'memory_entries': len(self._memory),
+            'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0
+        }
+
+    def reset_stats(self):
+        """Reset hit/miss counters."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.disk_hits = 0
+
+    def clear(self):
+        """Drop every cached entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM ledger_score_cache")
+                self._conn.commit()
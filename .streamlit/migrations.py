@@ -0,0 +1,160 @@
+"""
+Schema Migrations
+Versioned, in-place upgrades for existing databases. create_all() only adds
+missing tables, so columns and indexes added to an existing table go here:
+each migration is a numbered step applied once, in order, and recorded in
+the schema_migrations table. Steps check before they change anything, so a
+step interrupted halfway can simply be run again.
+
+init_database() applies pending migrations on startup. From the .streamlit
+directory:
+    python migrations.py              # upgrade PBC_DATABASE_URL (default pbc_automator.db)
+    python migrations.py --status     # show applied and pending migrations
+"""
+
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+SCHEMA_MIGRATIONS_TABLE = "schema_migrations"
+# Postgres advisory lock key held while a migration runs
+MIGRATION_LOCK_ID = 7263144
+
+_metadata = MetaData()
+schema_migrations = Table(
+    SCHEMA_MIGRATIONS_TABLE, _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String, nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+# (name, table, columns); the models in database.py declare the same indexes,
+# so new databases get them from create_all()
+FOREIGN_KEY_INDEXES = [
+    ('ix_client_profiles_ca_id', 'client_profiles', ['ca_id']),
+    ('ix_audit_projects_ca_id_status', 'audit_projects', ['ca_id', 'status']),
+    ('ix_audit_projects_client_id_status', 'audit_projects', ['client_id', 'status']),
+    ('ix_pbc_items_project_id_status', 'pbc_items', ['project_id', 'status']),
+    ('ix_pbc_documents_pbc_id', 'pbc_documents', ['pbc_id']),
+    ('ix_pbc_documents_uploaded_by', 'pbc_documents', ['uploaded_by']),
+    ('ix_pbc_comments_pbc_id_created_at', 'pbc_comments', ['pbc_id', 'created_at']),
+    ('ix_pbc_comments_user_id', 'pbc_comments', ['user_id']),
+]
+
+
+def _add_column(connection, table: str, column: str, ddl_type: str):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there."""
+    if column not in {existing['name'] for existing in inspect(connection).get_columns(table)}:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+
+
+def _create_indexes(connection, indexes: Sequence[Tuple[str, str, List[str]]]):
+    for name, table, columns in indexes:
+        connection.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def _ca_firm_registration_no(connection):
+    # Added to the model before migrations existed; older databases lack it
+    _add_column(connection, 'ca_profiles', 'firm_registration_no', 'VARCHAR')
+
+
+def _foreign_key_indexes(connection):
+    _create_indexes(connection, FOREIGN_KEY_INDEXES)
+
+
+# Append only: never renumber or edit a migration that has shipped
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "Add ca_profiles.firm_registration_no", _ca_firm_registration_no),
+    (2, "Index foreign keys and dashboard filters", _foreign_key_indexes),
+]
+
+
+def applied_versions(connection) -> Dict[int, datetime]:
+    """{version: applied_at} for the migrations recorded in this database."""
+    if not inspect(connection).has_table(SCHEMA_MIGRATIONS_TABLE):
+        return {}
+    return dict(connection.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all())
+
+
+def current_version(engine) -> int:
+    with engine.connect() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def _begin_locked(connection):
+    """
+    Start the connection's transaction holding the database's migration
+    lock, so two processes or threads cannot apply the same step.
+    """
+    if connection.dialect.name == "sqlite":
+        # Takes the write lock now instead of at the first write; waits up to busy_timeout
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    elif connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_ID})")
+
+
+def upgrade(engine, target: int = None) -> List[int]:
+    """
+    Apply pending migrations up to target (default: all), each in its own
+    transaction together with its schema_migrations row. Each transaction
+    takes the migration lock first and re-reads the applied versions, so a
+    step another process applied meanwhile is skipped, not run twice.
+
+    Parameters:
+    -----------
+    engine : sqlalchemy.engine.Engine
+        Database to upgrade; the tables from create_all() must already exist
+    target : int, optional
+        Last version to apply
+
+    Returns:
+    --------
+    List of versions applied by this call
+    """
+    wanted = [migration for migration in MIGRATIONS if target is None or migration[0] <= target]
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    if all(version in applied for version, _, _ in wanted):
+        return []
+
+    newly_applied = []
+    for version, description, migrate in wanted:
+        with engine.connect() as connection:
+            _begin_locked(connection)
+            schema_migrations.create(connection, checkfirst=True)
+            if version in applied_versions(connection):
+                connection.rollback()
+                continue
+            migrate(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()))
+            connection.commit()
+        newly_applied.append(version)
+    return newly_applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade the PBC Automator database schema")
+    parser.add_argument("--status", action="store_true", help="Show migrations without applying them")
+    parser.add_argument("--target", type=int, help="Last version to apply")
+    args = parser.parse_args()
+
+    from database import DATABASE_URL, Base, get_engine
+    engine = get_engine()
+    print(f"Database: {DATABASE_URL}")
+    if not args.status:
+        Base.metadata.create_all(bind=engine)
+        applied = upgrade(engine, args.target)
+        print(f"Applied: {applied or 'nothing, already up to date'}")
+
+    with engine.connect() as connection:
+        recorded = applied_versions(connection)
+    for version, description, _ in MIGRATIONS:
+        state = f"applied {recorded[version]:%Y-%m-%d %H:%M}" if version in recorded else "pending"
+        print(f"  {version:>3}  {description:<45} {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+PBC Item Builder
+Turns a ledger-level mapping result into PBC items: one row per mapped PBC
+category with its totals, ledger count, major category, description, why
+needed and priority. Runs without Streamlit, so it can be tested and
+benchmarked on its own.
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+import pandas as pd
+
+from tb_mapper import UNMAPPED_CATEGORY
+
+# Category keyword -> description; {ledger_names} is filled per PBC item
+DESCRIPTION_TEMPLATES = {
+    "Fixed Assets": "Fixed asset register with details of {ledger_names}. Include purchase invoices, depreciation schedule, and disposal records.",
+    "Bank": "Bank statements and reconciliations for {ledger_names}. Include bank confirmation letters.",
+    "Cash": "Cash book, petty cash records, and cash count certificates as on year-end.",
+    "Inventories": "Stock statement with valuation details for {ledger_names}. Include physical verification reports.",
+    "Trade Receivables": "Debtors list with ageing for {ledger_names}. Include confirmation letters and subsequent collection details.",
+    "Trade Payables": "Creditors list with ageing for {ledger_names}. Include confirmation letters and MSME classification.",
+    "Loans": "Loan agreements, sanction letters, and repayment schedules for {ledger_names}.",
+    "GST": "GST returns (GSTR-1, GSTR-3B), GST reconciliation, and ITC working papers.",
+    "Sales": "Sales register, invoices, and supporting documents. Include GST reconciliation.",
+    "Expenses": "Expense vouchers and supporting documents for {ledger_names}.",
+    "Salary": "Salary sheets, PF/ESI challans, and Form 16 for employees.",
+}
+
+WHY_NEEDED = {
+    "Fixed Assets": "To verify existence, ownership, valuation and completeness of fixed assets as per AS-10/Ind AS 16",
+    "Bank": "To confirm existence and accuracy of bank balances and reconcile book balances with bank statements",
+    "Cash": "To verify existence of cash and ensure proper controls over cash handling",
+    "Inventories": "To verify existence, ownership, condition and valuation of inventory as per AS-2/Ind AS 2",
+    "Trade Receivables": "To confirm existence, recoverability and completeness of receivables",
+    "Trade Payables": "To verify completeness and accuracy of liabilities and MSME compliance",
+    "Loans": "To verify terms, conditions, repayment schedule and compliance with loan covenants",
+    "GST": "To verify GST compliance and ensure accurate reporting of input and output tax",
+    "Sales": "To verify revenue recognition, cut-off and ensure completeness of sales",
+    "Expenses": "To verify nature, authorization and proper accounting of expenses",
+    "Salary": "To verify employee costs and compliance with statutory requirements",
+}
+
+# Categories that are always High priority, whatever the amount
+HIGH_PRIORITY_TERMS = ["bank", "cash", "sales", "revenue", "receivable", "payable", "loan", "borrowing"]
+
+# First match wins, in this order
+MAJOR_CATEGORY_TERMS = [
+    ('Fixed Assets', ['fixed asset', 'intangible', 'capital wip', 'ppe']),
+    ('Inventories', ['inventor', 'raw material', 'wip', 'finished', 'stock']),
+    ('Trade Receivables', ['receivable', 'debtor']),
+    ('Cash & Bank', ['cash', 'bank']),
+    ('Trade Payables', ['payable', 'creditor']),
+    ('Equity', ['share capital', 'equity', 'reserve', 'retained']),
+    ('Borrowings', ['borrowing', 'loan']),
+    ('Statutory Compliance', ['gst', 'tds', 'tax']),
+    ('Revenue', ['sales', 'revenue', 'income']),
+    ('Expenses', ['expense', 'cost', 'depreciation']),
+]
+
+PBC_ITEM_COLUMNS = ["Item_Number", "PBC_Category", "Category", "Item_Description", "Why_Needed",
+                    "Priority", "Ledger_Count", "Debit_Amount", "Credit_Amount"]
+
+
+@lru_cache(maxsize=None)
+def category_profile(pbc_category: str) -> Dict:
+    """
+    Everything about a PBC category that does not depend on its ledgers,
+    resolved once per category: major category, description template, why
+    needed and whether it is always High priority.
+    """
+    category_lower = pbc_category.lower()
+    template = next((template for key, template in DESCRIPTION_TEMPLATES.items() if key.lower() in category_lower),
+                    None)
+    why_needed = next((explanation for key, explanation in WHY_NEEDED.items() if key.lower() in category_lower),
+                      f"To verify, validate and ensure proper accounting treatment of {pbc_category}")
+    major = next((major for major, terms in MAJOR_CATEGORY_TERMS if any(term in category_lower for term in terms)),
+                 'Other')
+    return {
+        'major_category': major,
+        # None: no template matched and the description is the fixed default
+        'description_template': template,
+        'default_description': f"Supporting documents and schedules for {pbc_category}. Includes ledger extracts and vouchers.",
+        'why_needed': why_needed,
+        'always_high': any(term in category_lower for term in HIGH_PRIORITY_TERMS)
+    }
+
+
+def _ledger_list(top_ledgers: List[str], ledger_count: int) -> str:
+    """ "A, B, C and 4 more" from the first three ledger rows of a category."""
+    ledger_names = ", ".join(top_ledgers)
+    if ledger_count > 3:
+        ledger_names += f" and {ledger_count - 3} more"
+    return ledger_names
+
+
+def _describe(pbc_category: str, top_ledgers: List[str], ledger_count: int) -> str:
+    profile = category_profile(pbc_category)
+    if profile['description_template'] is None:
+        return profile['default_description']
+    return profile['description_template'].format(ledger_names=_ledger_list(top_ledgers, ledger_count))
+
+
+def _priority(pbc_category: str, debit: float, credit: float) -> str:
+    if category_profile(pbc_category)['always_high']:
+        return "High"
+    amount = max(abs(debit), abs(credit))
+    if amount > 1000000:  # > 10 lakhs
+        return "High"
+    if amount > 100000:  # > 1 lakh
+        return "Medium"
+    return "Low"
+
+
+def generate_pbc_description(pbc_category: str, ledgers_df: pd.DataFrame) -> str:
+    """Generate PBC description based on category and ledgers"""
+    return _describe(pbc_category, ledgers_df['Original_Ledger_Name'].head(3).tolist(), len(ledgers_df))
+
+
+def generate_why_needed(pbc_category: str) -> str:
+    """Generate why needed explanation"""
+    return category_profile(pbc_category)['why_needed']
+
+
+def determine_priority(pbc_category: str, debit: float, credit: float) -> str:
+    """Determine priority based on category and amounts"""
+    return _priority(pbc_category, debit, credit)
+
+
+def get_major_category(pbc_category: str) -> str:
+    """Get major category for grouping"""
+    return category_profile(pbc_category)['major_category']
+
+
+def build_pbc_items(mapping_result: pd.DataFrame, first_item_number: int = 1) -> pd.DataFrame:
+    """
+    One PBC item per mapped category, in order of first appearance.
+
+    Totals, ledger counts and the first three ledger names come from a single
+    groupby over the mapping result; the per-category text is resolved through
+    category_profile.
+
+    Returns a DataFrame with PBC_ITEM_COLUMNS, numbered from first_item_number.
+    """
+    mapped = mapping_result[mapping_result['PBC_Category'] != UNMAPPED_CATEGORY]
+    aggregations = {
+        'Ledger_Count': ('Original_Ledger_Name', 'size'),
+        'Top_Ledgers': ('Original_Ledger_Name', lambda names: names.iloc[:3].tolist())
+    }
+    for column in ('Debit_Amount', 'Credit_Amount'):
+        if column in mapped.columns:
+            aggregations[column] = (column, 'sum')
+    grouped = mapped.groupby('PBC_Category', sort=False, observed=True).agg(**aggregations)
+    for column in ('Debit_Amount', 'Credit_Amount'):
+        if column not in grouped.columns:
+            grouped[column] = 0
+
+    categories = grouped.index.astype(str).tolist()
+    items = pd.DataFrame({
+        'Item_Number': range(first_item_number, first_item_number + len(grouped)),
+        'PBC_Category': categories,
+        'Category': [category_profile(category)['major_category'] for category in categories],
+        'Item_Description': [_describe(category, top, count) for category, top, count in
+                             zip(categories, grouped['Top_Ledgers'], grouped['Ledger_Count'])],
+        'Why_Needed': [category_profile(category)['why_needed'] for category in categories],
+        'Priority': [_priority(category, debit, credit) for category, debit, credit in
+                     zip(categories, grouped['Debit_Amount'], grouped['Credit_Amount'])],
+        'Ledger_Count': grouped['Ledger_Count'].to_numpy(),
+        'Debit_Amount': grouped['Debit_Amount'].to_numpy(),
+        'Credit_Amount': grouped['Credit_Amount'].to_numpy()
+    }, columns=PBC_ITEM_COLUMNS)
+    return items
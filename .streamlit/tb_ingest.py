@@ -0,0 +1,675 @@
+"""
+Trial Balance Ingestion
+Fast readers for uploaded trial balances. The header row and the ledger and
+amount columns are detected on a sample of the first rows, so Tally/Busy
+exports with company banners and headers like "Particulars" / "Closing Dr"
+are accepted. Only the needed columns are then read, with explicit types, and
+amounts in Indian accounting formats ("1,23,456.00 Dr", "(1,234.00)",
+"₹ 5,000/-") are parsed to float64.
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import os
+import re
+from collections import Counter
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from openpyxl import load_workbook
+
+REQUIRED_COLUMNS = ['Account Name', 'Debit', 'Credit']
+
+# Bump when readers change what they return, so cached parsed uploads are re-read
+INGEST_VERSION = "5"
+
+Source = Union[str, BinaryIO]
+
+
+def parse_amounts(values, side: str = 'Dr') -> np.ndarray:
+    """
+    Parse amount cells to float64.
+
+    Numeric cells pass straight through. Text cells are parsed vectorized with
+    Arrow compute kernels: commas (lakh or thousand grouping), currency markers
+    (₹, Rs., INR) and a trailing "/-" are ignored. A Dr/Cr suffix opposite to
+    the column's side ("Cr" in a Debit column), parentheses or a leading minus
+    make the amount negative (two of them cancel out). A lone "-" is zero;
+    blank or unparseable cells are NaN.
+
+    Parameters:
+    -----------
+    values : array-like, pa.Array or pa.ChunkedArray
+        Amount cells
+    side : str
+        'Dr' for a debit or balance column, 'Cr' for a credit column
+    """
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        if pa.types.is_integer(values.type) or pa.types.is_floating(values.type):
+            return np.asarray(pc.cast(values, pa.float64()).to_numpy(zero_copy_only=False), dtype=np.float64)
+        return _parse_amount_text(pc.cast(values, pa.string()), side)
+
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # Mixed cells (e.g. from Excel): numbers and plain numeric strings first
+    amounts = np.array(pd.to_numeric(series, errors="coerce"), dtype=np.float64)
+    pending = np.isnan(amounts) & series.notna().to_numpy()
+    if pending.any():
+        text = pa.array(series[pending].astype(str).tolist(), type=pa.string())
+        amounts[pending] = _parse_amount_text(text, side)
+    return amounts
+
+
+def _parse_amount_text(text, side: str = 'Dr') -> np.ndarray:
+    """Vectorized parse of Indian-format amount strings (see parse_amounts)."""
+    opposite = "DR" if side.upper().startswith("CR") else "CR"
+    text = pc.utf8_upper(pc.utf8_trim_whitespace(text))
+    text = pc.replace_substring_regex(text, r"^(₹|RS\.?|INR)\s*", "")
+    # Literal kernels and trims are several times cheaper than regex replaces
+    text = pc.replace_substring(text, "/-", "")
+
+    is_opposite = pc.or_(pc.ends_with(text, opposite), pc.ends_with(text, opposite + "."))
+    text = pc.utf8_rtrim(text, characters="DRC. ")
+    in_parentheses = pc.and_(pc.starts_with(text, "("), pc.ends_with(text, ")"))
+    has_minus = pc.starts_with(text, "-")
+    dash_only = pc.equal(text, "-")
+
+    digits = pc.utf8_trim(text, characters="()- ")
+    digits = pc.replace_substring(pc.replace_substring(digits, ",", ""), " ", "")
+    valid = pc.match_substring_regex(digits, r"^(\d+\.?\d*|\.\d+)$")
+    magnitude = pc.cast(pc.if_else(valid, digits, pa.scalar(None, pa.string())), pa.float64())
+
+    negative = pc.xor(pc.xor(is_opposite, in_parentheses), has_minus)
+    amounts = pc.if_else(pc.fill_null(negative, False), pc.negate(magnitude), magnitude)
+    amounts = pc.if_else(dash_only, pa.scalar(0.0), amounts)
+    return np.asarray(amounts.to_numpy(zero_copy_only=False), dtype=np.float64)
+
+
+class TrialBalanceLayout:
+    """
+    Where the header and the ledger/amount columns sit in an uploaded file.
+
+    Columns are stored by position so the layout detected on a sample can be
+    applied to the full parse. Amounts are either a Debit/Credit pair or one
+    signed closing balance (positive is debit).
+    """
+
+    def __init__(self, header_row: Optional[int], data_start: int, column_names: List[str],
+                 ledger: int, debit: Optional[int] = None, credit: Optional[int] = None,
+                 balance: Optional[int] = None):
+        self.header_row = header_row
+        self.data_start = data_start
+        self.column_names = column_names
+        self.ledger = ledger
+        self.debit = debit
+        self.credit = credit
+        self.balance = balance
+
+    @property
+    def amount_positions(self) -> List[int]:
+        return [position for position in (self.debit, self.credit, self.balance) if position is not None]
+
+    def describe(self) -> str:
+        """One-line summary for the upload screen."""
+        header = f"header on row {self.header_row + 1}" if self.header_row is not None else "no header row"
+        parts = [header, f"ledger '{self.column_names[self.ledger]}'"]
+        if self.balance is not None:
+            parts.append(f"balance '{self.column_names[self.balance]}'")
+        else:
+            parts.append(f"debit '{self.column_names[self.debit]}'")
+            parts.append(f"credit '{self.column_names[self.credit]}'")
+        return ", ".join(parts)
+
+
+DEFAULT_SAMPLE_ROWS = 50
+
+LEDGER_HEADER_WORDS = ['particulars', 'ledger', 'account', 'description', 'name', 'head']
+AMOUNT_HEADER_WORDS = ['debit', 'credit', 'dr', 'cr', 'balance', 'closing', 'opening', 'amount', 'net']
+SIDE_WORDS = {'debit', 'credit', 'dr', 'cr', 'dr.', 'cr.'}
+TOTAL_ROW_NAMES = {'total', 'grand total', 'totals'}
+
+
+def _cell_text(cell) -> str:
+    return "" if cell is None else str(cell).strip()
+
+
+def _header_words(name: str) -> List[str]:
+    return [word for word in re.split(r"[^a-z]+", name.lower()) if word]
+
+
+def _header_hits(row: Sequence) -> int:
+    """How many cells of a row read like trial balance column names."""
+    vocabulary = set(LEDGER_HEADER_WORDS) | set(AMOUNT_HEADER_WORDS)
+    return sum(1 for cell in row if vocabulary.intersection(_header_words(_cell_text(cell))))
+
+
+def _find_header(rows: List[list], has_amount: np.ndarray) -> Optional[int]:
+    """
+    Index of the header row among sampled rows.
+
+    A header has at least two text cells and no amounts, and is followed by
+    a row with an amount. Among those, the row with the most column-like
+    names wins, so banners such as "Trial Balance" lose to the real header.
+    """
+    best, best_hits = None, 0
+    for index, row in enumerate(rows[:-1]):
+        texts = [_cell_text(cell) for cell in row]
+        if sum(1 for text in texts if text) < 2 or has_amount[index]:
+            continue
+        if not has_amount[index + 1:index + 4].any():
+            continue
+        hits = _header_hits(row)
+        if best is None or hits > best_hits:
+            best, best_hits = index, hits
+    return best
+
+
+def _column_names(rows: List[list], has_amount: np.ndarray, header_row: Optional[int],
+                  width: int) -> Tuple[List[str], int]:
+    """
+    Column names and the first data row. A second header row holding only
+    Debit/Credit labels (Tally's "Closing Balance" over "Debit | Credit") is
+    merged into the names above it.
+    """
+    if header_row is None:
+        first_data = int(np.argmax(has_amount)) if has_amount.any() else 0
+        return [f"Column {position + 1}" for position in range(width)], first_data
+
+    header = [_cell_text(cell) for cell in rows[header_row]] + [""] * width
+    header = header[:width]
+    data_start = header_row + 1
+
+    if data_start < len(rows):
+        sub_header = ([_cell_text(cell) for cell in rows[data_start]] + [""] * width)[:width]
+        labels = [text for text in sub_header if text]
+        if labels and all(text.lower() in SIDE_WORDS for text in labels):
+            # Merged header cells only carry their text in the first cell
+            filled, last = [], ""
+            for text in header:
+                last = text or last
+                filled.append(last)
+            header = [f"{filled[position]} {label}".strip() if label else header[position]
+                      for position, label in enumerate(sub_header)]
+            data_start += 1
+
+    names = [name or f"Column {position + 1}" for position, name in enumerate(header)]
+    return names, data_start
+
+
+def _profile_columns(text: np.ndarray, amounts: np.ndarray) -> List[Dict]:
+    """Text and amount shares of each column over the sampled data rows."""
+    profiles = []
+    for position in range(text.shape[1]):
+        column_text = pd.Series(text[:, position], dtype=object)
+        nonblank = (column_text != "").to_numpy()
+        numeric = ~np.isnan(amounts[:, position]) & nonblank
+        textual = nonblank & ~numeric
+        n_nonblank = max(int(nonblank.sum()), 1)
+        integers = amounts[numeric, position]
+        serial = (len(integers) > 2 and np.all(integers == np.round(integers))
+                  and np.all(np.diff(integers) == 1))
+        profiles.append({
+            'text_share': textual.sum() / max(len(column_text), 1),
+            'numeric_share': numeric.sum() / n_nonblank,
+            'has_amounts': bool(numeric.any()) and not serial,
+            'distinct_share': column_text[textual].nunique() / max(int(textual.sum()), 1)
+        })
+    return profiles
+
+
+def _amount_rank(name: str) -> int:
+    """Closing balances beat transaction totals, which beat opening balances."""
+    words = _header_words(name)
+    if 'closing' in words:
+        return 2
+    if 'opening' in words:
+        return -2
+    return 1 if 'balance' in words else 0
+
+
+def detect_layout(rows: List[list]) -> TrialBalanceLayout:
+    """
+    Infer the header row and ledger/amount columns from the first rows of a file.
+
+    The ledger column is the most text-heavy, varied column, unless a column
+    has a ledger-like header, which wins even over numeric ledger codes; amount columns are those whose values parse as
+    amounts, or any columns headed Debit/Dr and Credit/Cr when both exist,
+    since the sample may hold no credits yet. Debit/Credit columns are picked by name, closing balance first;
+    failing that a single balance column is used, or the last two amount
+    columns of an unnamed layout.
+    """
+    width = max((len(row) for row in rows), default=0)
+    rows = [list(row) + [None] * (width - len(row)) for row in rows]
+    # Every sampled cell is parsed once, as text and as an amount
+    text = np.array([[_cell_text(cell) for cell in row] for row in rows], dtype=object).reshape(len(rows), width)
+    amounts = parse_amounts(pd.Series([cell for row in rows for cell in row], dtype=object)).reshape(len(rows), width)
+    has_amount = (~np.isnan(amounts) & (text != "")).any(axis=1)
+
+    header_row = _find_header(rows, has_amount)
+    column_names, data_start = _column_names(rows, has_amount, header_row, width)
+    profiles = _profile_columns(text[data_start:], amounts[data_start:])
+
+    def ledger_named(position: int) -> bool:
+        # "Account Balance" names an amount, not the ledger
+        words = set(_header_words(column_names[position]))
+        return bool(words.intersection(LEDGER_HEADER_WORDS)) and not words.intersection(AMOUNT_HEADER_WORDS)
+
+    def ledger_score(position: int) -> float:
+        profile = profiles[position]
+        # A ledger-like header outranks any unnamed column, however text-heavy
+        return profile['text_share'] * profile['distinct_share'] + (2.0 if ledger_named(position) else 0.0)
+
+    # A named ledger column is trusted even when its values are mostly
+    # numeric ledger codes; unnamed columns must be mostly text
+    text_columns = [position for position, profile in enumerate(profiles)
+                    if ledger_named(position) or profile['text_share'] >= 0.5]
+    if not text_columns:
+        raise ValueError("Could not find a ledger name column in the Trial Balance")
+    ledger = max(text_columns, key=ledger_score)
+
+    def is_amount_column(position: int) -> bool:
+        # An amount-like name tolerates a few bad cells; those are reported by tb_validation
+        named = bool(set(AMOUNT_HEADER_WORDS).intersection(_header_words(column_names[position])))
+        profile = profiles[position]
+        return profile['has_amounts'] and profile['numeric_share'] >= (0.5 if named else 0.8)
+
+    def named_as(position: int, words: Sequence[str]) -> bool:
+        return position != ledger and bool(set(words).intersection(_header_words(column_names[position])))
+
+    # Named Debit and Credit columns are trusted whatever the sample holds: a
+    # debit-first TB can have a blank Credit column for its first rows
+    debit_named = [position for position in range(width) if named_as(position, ['debit', 'dr'])]
+    credit_named = [position for position in range(width) if named_as(position, ['credit', 'cr'])]
+    # A single "Dr/Cr" indicator column names both sides and declares nothing
+    declared = (set(debit_named + credit_named)
+                if any(debit != credit for debit in debit_named for credit in credit_named) else set())
+    amount_columns = [position for position in range(width)
+                      if position != ledger and (position in declared or is_amount_column(position))]
+    if not amount_columns:
+        raise ValueError("Could not find Debit/Credit or balance columns in the Trial Balance")
+
+    def best(words: Sequence[str]) -> Optional[int]:
+        named = [position for position in amount_columns
+                 if set(words).intersection(_header_words(column_names[position]))]
+        # Rightmost wins ties: Tally puts the closing balance last
+        return max(named, key=lambda position: (_amount_rank(column_names[position]), position)) if named else None
+
+    layout = dict(header_row=header_row, data_start=data_start, column_names=column_names, ledger=ledger)
+    debit, credit = best(['debit', 'dr']), best(['credit', 'cr'])
+    if debit is not None and credit is not None and debit != credit:
+        return TrialBalanceLayout(debit=debit, credit=credit, **layout)
+    balance = best(['balance', 'closing', 'amount', 'net'])
+    if balance is not None:
+        return TrialBalanceLayout(balance=balance, **layout)
+    if len(amount_columns) >= 2:
+        return TrialBalanceLayout(debit=amount_columns[-2], credit=amount_columns[-1], **layout)
+    return TrialBalanceLayout(balance=amount_columns[0], **layout)
+
+
+def _unparsed(values, amounts: np.ndarray) -> np.ndarray:
+    """Cells that hold something but did not parse as an amount."""
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        text = pc.utf8_trim_whitespace(pc.cast(values, pa.string()))
+        nonblank = pc.fill_null(pc.not_equal(text, ""), False).to_numpy(zero_copy_only=False)
+    else:
+        series = pd.Series(values, dtype=object)
+        nonblank = (series.notna() & (series.astype(str).str.strip() != "")).to_numpy()
+    return nonblank & np.isnan(amounts)
+
+
+def _build_frame(layout: TrialBalanceLayout, ledgers, amounts: Dict[int, object],
+                 ragged: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Canonical Account Name/Debit/Credit frame from the parsed columns, with
+    the layout's description in df.attrs['layout'], the 1-based rows of
+    unparseable amount cells per source column in df.attrs['non_numeric'] and
+    the 1-based rows whose field count differed from the file's (ragged, set
+    by the CSV reader) in df.attrs['ragged_rows'].
+
+    A signed balance is split into Debit (positive) and Credit (negative)
+    amounts. Blank rows and "Total"/"Grand Total" rows are dropped.
+    """
+    ledger_names = pd.Series(ledgers, dtype=object).reset_index(drop=True)
+    if layout.balance is not None:
+        balance = parse_amounts(amounts[layout.balance])
+        debit = np.where(balance > 0, balance, np.where(np.isnan(balance), np.nan, 0.0))
+        credit = np.where(balance < 0, -balance, np.where(np.isnan(balance), np.nan, 0.0))
+        unparsed = {layout.balance: _unparsed(amounts[layout.balance], balance)}
+    else:
+        debit = parse_amounts(amounts[layout.debit], 'Dr')
+        credit = parse_amounts(amounts[layout.credit], 'Cr')
+        unparsed = {layout.debit: _unparsed(amounts[layout.debit], debit),
+                    layout.credit: _unparsed(amounts[layout.credit], credit)}
+
+    text = ledger_names.fillna("").astype(str).str.strip()
+    blank = (text == "").to_numpy() & np.isnan(debit) & np.isnan(credit)
+    for mask in unparsed.values():
+        blank &= ~mask
+    total = text.str.lower().isin(TOTAL_ROW_NAMES).to_numpy()
+    keep = ~(blank | total)
+
+    df = pd.DataFrame({
+        'Account Name': ledger_names[keep].reset_index(drop=True),
+        'Debit': debit[keep],
+        'Credit': credit[keep]
+    })
+    df.attrs['layout'] = layout.describe()
+    df.attrs['non_numeric'] = {
+        layout.column_names[position]: (np.flatnonzero(mask[keep]) + 1).tolist()
+        for position, mask in unparsed.items() if mask[keep].any()
+    }
+    df.attrs['ragged_rows'] = [] if ragged is None else (np.flatnonzero(ragged[keep]) + 1).tolist()
+    return df
+
+
+def _sample_csv_rows(source: Source, sample_rows: int) -> List[list]:
+    """First rows of a CSV parsed with the csv module, which tolerates ragged banner rows."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+        lines = [source.readline() for _ in range(sample_rows)]
+    else:
+        with open(source, "rb") as f:
+            lines = [f.readline() for _ in range(sample_rows)]
+    text = b"".join(lines).decode("utf-8-sig", errors="replace")
+    return [row for row in csv.reader(io.StringIO(text))]
+
+
+def read_trial_balance_csv(source: Source, layout: Optional[TrialBalanceLayout] = None,
+                           sample_rows: int = DEFAULT_SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Read a CSV trial balance with pyarrow's multithreaded reader.
+
+    The layout is detected on the first sample_rows rows, then the file is
+    parsed once from the first data row, converting only the ledger and amount
+    columns, all as strings so amount formats can be parsed uniformly.
+    """
+    rows = _sample_csv_rows(source, sample_rows)
+    layout = layout or detect_layout(rows)
+    positions = [layout.ledger, *layout.amount_positions]
+    # The usual field count of the data rows, not the widest sampled row
+    lengths = Counter(len(row) for row in rows[layout.data_start:] if row)
+    width = max(lengths.most_common(1)[0][0] if lengths else max(map(len, rows)), max(positions) + 1)
+    names = [f"c{position}" for position in range(width)]
+    wanted = [names[position] for position in positions]
+
+    ragged_rows = []
+
+    def note_ragged(row) -> str:
+        ragged_rows.append(row.number)
+        return "skip"
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(skip_rows=layout.data_start, column_names=names),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=note_ragged),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=wanted,
+            column_types={name: pa.string() for name in wanted},
+            strings_can_be_null=True
+        )
+    )
+    if ragged_rows:
+        # pyarrow can only skip rows with another field count (footnotes, a
+        # stray trailing comma), so read the file again keeping them all
+        return _read_ragged_csv(source, layout, width)
+    amounts = {position: table[names[position]] for position in layout.amount_positions}
+    return _build_frame(layout, table[names[layout.ledger]].to_pandas(), amounts)
+
+
+def _read_ragged_csv(source: Source, layout: TrialBalanceLayout, width: int) -> pd.DataFrame:
+    """
+    Slower csv-module read for files with ragged rows: short rows are padded
+    and long rows truncated to width, and their rows are reported in
+    df.attrs['ragged_rows'] instead of being dropped.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+        data = source.read()
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    reader = csv.reader(io.StringIO(data.decode("utf-8-sig", errors="replace")))
+    rows = list(itertools.islice(reader, layout.data_start, None))
+
+    positions = [layout.ledger, *layout.amount_positions]
+    values = [[row[position] if position < len(row) else None for row in rows] for position in positions]
+    ragged = np.array([0 < len(row) != width for row in rows], dtype=bool)
+    amounts = {position: pd.Series(cells, dtype=object) for position, cells in zip(positions[1:], values[1:])}
+    return _build_frame(layout, values[0], amounts, ragged)
+
+
+def read_trial_balance_xlsx(source: Source, layout: Optional[TrialBalanceLayout] = None,
+                            sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                            sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """
+    Stream an .xlsx trial balance with openpyxl in read-only mode.
+
+    The first sample_rows rows are buffered for layout detection and the same
+    row stream then continues, so the sheet is read once. Only the needed
+    cells of each row are kept.
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        sample = list(itertools.islice(rows, sample_rows))
+        if not sample:
+            raise ValueError("Trial Balance sheet is empty")
+        layout = layout or detect_layout(sample)
+
+        positions = [layout.ledger, *layout.amount_positions]
+        values: List[list] = [[] for _ in positions]
+        for row in itertools.chain(sample[layout.data_start:], rows):
+            for cells, position in zip(values, positions):
+                cells.append(row[position] if position < len(row) else None)
+    finally:
+        workbook.close()
+
+    amounts = {position: pd.Series(cells, dtype=object) for position, cells in zip(positions[1:], values[1:])}
+    return _build_frame(layout, values[0], amounts)
+
+
+def read_trial_balance(source: Source,
+                       filename: Optional[str] = None,
+                       layout: Optional[TrialBalanceLayout] = None,
+                       sample_rows: int = DEFAULT_SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Read an uploaded trial balance (CSV, XLSX, legacy XLS or Tally XML).
+
+    Parameters:
+    -----------
+    source : str or file-like
+        Path or uploaded file
+    filename : str, optional
+        Used to pick the reader; defaults to source.name or the path
+    layout : TrialBalanceLayout, optional
+        Skip detection and read with this layout
+    sample_rows : int
+        Rows sampled to detect the header and columns
+
+    Returns a DataFrame with Account Name and float64 Debit/Credit columns
+    (Tally XML adds Parent Group and balances, see iter_tally_xml).
+    The detected layout is kept in df.attrs['layout'] and unparseable amount
+    cells in df.attrs['non_numeric'].
+    """
+    filename = filename or getattr(source, "name", None) or (source if isinstance(source, str) else "")
+    extension = os.path.splitext(str(filename))[1].lower()
+
+    if extension == ".csv":
+        return read_trial_balance_csv(source, layout, sample_rows)
+    if extension == ".xml":
+        return read_tally_xml(source)
+    if extension in (".xlsx", ".xlsm"):
+        return read_trial_balance_xlsx(source, layout, sample_rows)
+
+    # Legacy .xls needs xlrd through pandas; read once without a header
+    if hasattr(source, "seek"):
+        source.seek(0)
+    raw = pd.read_excel(source, header=None, dtype=object)
+    sample = raw.head(sample_rows)
+    layout = layout or detect_layout(sample.where(sample.notna(), None).values.tolist())
+    data = raw.iloc[layout.data_start:]
+    amounts = {position: data[position] for position in layout.amount_positions}
+    return _build_frame(layout, data[layout.ledger].to_numpy(), amounts)
+
+
+# Character references Tally writes for control characters; not allowed in XML 1.0
+_INVALID_CHARACTER_REFERENCES = re.compile(r"&#(?:x0*[0-8bcef]|x0*1[0-9a-f]|0*(?:[0-8]|1[1-2]|1[4-9]|2[0-9]|3[01]));",
+                                           re.IGNORECASE)
+_XML_ENCODING_DECLARATION = re.compile(r"""(<\?xml[^>]*?encoding\s*=\s*)["'][^"']*["']""")
+
+
+class _TallyXmlStream:
+    """
+    Binary file wrapper that feeds iterparse clean UTF-8.
+
+    Tally writes UTF-16 as often as UTF-8 and embeds character references
+    like "&#4;" that XML parsers reject. Blocks are decoded incrementally,
+    those references dropped and the text re-encoded, so the file is never
+    held in memory whole.
+    """
+
+    def __init__(self, raw: BinaryIO, block_size: int = 1 << 20):
+        self.raw = raw
+        self.block_size = block_size
+        head = raw.read(4)
+        if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+            encoding = "utf-16"
+        elif head.startswith((b"<\x00", b"\x00<")):
+            encoding = "utf-16-le" if head[0:1] == b"<" else "utf-16-be"
+        else:
+            encoding = "utf-8-sig"
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._pending = self._decoder.decode(head)
+        self._first = True
+
+    def read(self, size: int = -1) -> bytes:
+        block = self.raw.read(self.block_size)
+        text = self._pending + self._decoder.decode(block, final=not block)
+        # Keep a possibly cut-off character reference for the next block
+        cut = text.rfind("&")
+        if block and cut != -1 and ";" not in text[cut:]:
+            text, self._pending = text[:cut], text[cut:]
+        else:
+            self._pending = ""
+        if self._first:
+            text = _XML_ENCODING_DECLARATION.sub(r'\1"UTF-8"', text, count=1)
+            self._first = False
+        return _INVALID_CHARACTER_REFERENCES.sub("", text).encode("utf-8")
+
+
+def _ledger_name(ledger: ElementTree.Element) -> str:
+    """NAME attribute of a Tally LEDGER, else its first NAME element (NAME.LIST/LANGUAGENAME.LIST)."""
+    name = ledger.get("NAME")
+    if not name:
+        element = ledger.find(".//NAME")
+        name = element.text if element is not None else ""
+    return (name or "").strip()
+
+
+def _tally_frame(names: List[str], groups: List[str], opening: List[str], closing: List[str]) -> pd.DataFrame:
+    """
+    One chunk of Tally ledgers. Tally stores debit balances as negative
+    numbers (or with a "Dr" suffix); balances here are positive for debit.
+    """
+    opening_balance = -parse_amounts(pd.Series(opening, dtype=object), 'Cr')
+    closing_balance = -parse_amounts(pd.Series(closing, dtype=object), 'Cr')
+    # A ledger exported without a closing balance keeps NaN amounts
+    missing = np.isnan(closing_balance)
+    df = pd.DataFrame({
+        'Account Name': pd.Series(names, dtype=object),
+        'Parent Group': pd.Series(groups, dtype=object),
+        'Opening Balance': opening_balance,
+        'Closing Balance': closing_balance,
+        'Debit': np.where(closing_balance > 0, closing_balance, np.where(missing, np.nan, 0.0)),
+        'Credit': np.where(closing_balance < 0, -closing_balance, np.where(missing, np.nan, 0.0))
+    })
+    df.attrs['non_numeric'] = {
+        column: (np.flatnonzero(_unparsed(raw, parsed)) + 1).tolist()
+        for column, raw, parsed in (('OPENINGBALANCE', opening, opening_balance),
+                                    ('CLOSINGBALANCE', closing, closing_balance))
+        if _unparsed(raw, parsed).any()
+    }
+    return df
+
+
+def iter_tally_xml(source: Source, chunksize: int = 100000) -> Iterator[pd.DataFrame]:
+    """
+    Stream LEDGER masters out of a Tally XML export in chunks.
+
+    The file is parsed with iterparse and every element is removed from the
+    tree once read, so memory depends on chunksize rather than file size.
+    Chunks have Account Name, Parent Group, Opening Balance, Closing Balance
+    (positive for debit) and the closing balance split into Debit/Credit, and
+    can be passed straight to TrialBalanceToPBCMapper.iter_process_chunks.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as raw:
+            yield from iter_tally_xml(raw, chunksize)
+        return
+    source.seek(0)
+
+    names: List[str] = []
+    groups: List[str] = []
+    opening: List[str] = []
+    closing: List[str] = []
+    parents: List[ElementTree.Element] = []
+    open_ledgers = 0
+    for event, element in ElementTree.iterparse(_TallyXmlStream(source), events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            open_ledgers += element.tag == "LEDGER"
+            continue
+        parents.pop()
+        if element.tag == "LEDGER":
+            open_ledgers -= 1
+            names.append(_ledger_name(element))
+            groups.append((element.findtext("PARENT") or "").strip())
+            opening.append(element.findtext("OPENINGBALANCE"))
+            closing.append(element.findtext("CLOSINGBALANCE"))
+        if open_ledgers:
+            continue
+
+        # Free every finished element outside a ledger (vouchers, groups, the
+        # ledger itself) and detach it so the tree never grows
+        element.clear()
+        if parents:
+            parents[-1].remove(element)
+
+        if len(names) >= chunksize:
+            yield _tally_frame(names, groups, opening, closing)
+            names, groups, opening, closing = [], [], [], []
+
+    if names:
+        yield _tally_frame(names, groups, opening, closing)
+
+
+def read_tally_xml(source: Source, chunksize: int = 100000) -> pd.DataFrame:
+    """Whole Tally XML export as one frame of the iter_tally_xml columns."""
+    chunks = list(iter_tally_xml(source, chunksize))
+    if not chunks:
+        raise ValueError("No LEDGER entries found in the Tally XML export")
+    # Row numbers restart per chunk; shift them to positions in the whole frame
+    non_numeric: Dict[str, List[int]] = {}
+    offset = 0
+    for chunk in chunks:
+        for column, rows in chunk.attrs.get('non_numeric', {}).items():
+            non_numeric.setdefault(column, []).extend(row + offset for row in rows)
+        offset += len(chunk)
+    df = pd.concat(chunks, ignore_index=True)
+    df.attrs['layout'] = "Tally XML ledgers with parent groups"
+    df.attrs['non_numeric'] = non_numeric
+    return df
@@ -7,8 +7,108 @@ Maps trial balance ledgers to PBC categories using keyword and fuzzy matching
 import pandas as pd
 import numpy as np
 import re
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from types import MappingProxyType
 from rapidfuzz import fuzz, process
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Set
+from mapping_cache import MappingCache
+
+UNMAPPED_CATEGORY = "UNMAPPED - Manual Review Required"
+# Per-ledger mapping columns of process_trial_balance output
+MAPPING_COLUMNS = ["PBC_Category", "Confidence_Score", "Confidence_Level", "Match_Method", "Matched_Keyword"]
+
+# Common ledger abbreviations, expanded as whole tokens in ledgers and keywords alike
+LEDGER_ABBREVIATIONS = {
+    "a/c": "account", "a/cs": "accounts",
+    "exp": "expenses", "exps": "expenses",
+    "prov": "provision", "int": "interest", "adv": "advance",
+    "chgs": "charges", "depn": "depreciation"
+}
+_SPECIAL_CHARACTERS = re.compile(r'[^\w\s\-\/]')
+_WHITESPACE = re.compile(r'\s+')
+_ABBREVIATION_TOKENS = re.compile(
+    r'(?<!\S)(' + '|'.join(re.escape(abbreviation) for abbreviation in LEDGER_ABBREVIATIONS) + r')(?!\S)'
+)
+
+# Column-wise variants of the above over NUL-joined names (see normalize_ledgers)
+_COLUMN_SEPARATOR = "\x00"
+_COLUMN_SPECIAL_CHARACTERS = re.compile(r'[^\w\s\-\/\x00]')
+# Only rewrite whitespace that is not already a single space
+_COLUMN_WHITESPACE = re.compile(r' \s+|(?! )\s+')
+_COLUMN_ABBREVIATION_TOKENS = re.compile(
+    r'(?:(?<=[ \x00])|^)('
+    + '|'.join(re.escape(abbreviation) for abbreviation in sorted(LEDGER_ABBREVIATIONS, key=len, reverse=True))
+    + r')(?=[ \x00]|$)'
+)
+
+
+def _expand_abbreviation(match: re.Match) -> str:
+    return LEDGER_ABBREVIATIONS[match.group(1)]
+
+# Keyword dictionary data file and where its compiled form is cached
+KEYWORD_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pbc_keywords.json")
+KEYWORD_OVERLAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pbc_keyword_overlays.json")
+COMPILED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled_dictionaries")
+
+
+class _KeywordAutomaton:
+    """
+    Aho-Corasick automaton over normalized keywords.
+    A single pass over a ledger name reports every keyword it contains.
+    """
+    
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(pattern_id)
+        
+        # Breadth-first pass to wire failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def find(self, text: str) -> Set[int]:
+        """Return ids of all patterns occurring anywhere in text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
 
 class TrialBalanceToPBCMapper:
     """
@@ -16,7 +116,24 @@ class TrialBalanceToPBCMapper:
     using keyword matching and fuzzy matching algorithms.
     """
     
-    def __init__(self, audit_type: str = "Stat", accounting_standard: str = "Indian GAAP"):
+    # Candidate categories kept per ledger from each scoring pass
+    TOP_K = 3
+    # A parent group's (e.g. Tally's "Sundry Debtors") category scores count at this weight
+    GROUP_WEIGHT = 0.8
+    # Bump whenever scoring changes so cached score records are not reused
+    SCORER_VERSION = 2
+    # Bump whenever _compile_keyword_matcher changes so compiled cache files are rebuilt
+    COMPILED_FORMAT = 2
+    _COMPILED_ATTRIBUTES = (
+        "_categories", "_pattern_postings", "_always_postings", "_exact_categories",
+        "_keyword_automaton", "_fuzzy_keywords", "_fuzzy_offsets", "_fuzzy_choices",
+        "_token_index", "_trigram_index"
+    )
+    
+    def __init__(self, audit_type: str = "Stat", accounting_standard: str = "Indian GAAP",
+                 cache: Optional[MappingCache] = None, dictionary_path: Optional[str] = None,
+                 overlays_path: Optional[str] = None,
+                 compiled_cache_dir: Optional[str] = COMPILED_CACHE_DIR):
         """
         Initialize the mapper with audit type and accounting standard.
         
@@ -26,379 +143,105 @@ class TrialBalanceToPBCMapper:
             'Stat' for Statutory Audit or 'Tax' for Tax Audit
         accounting_standard : str
             'Indian GAAP' or 'Ind AS'
+        cache : MappingCache, optional
+            Shared cache of ledger mapping results, reused across trial balances
+        dictionary_path : str, optional
+            Keyword dictionary JSON file; defaults to pbc_keywords.json next to this module
+        overlays_path : str, optional
+            Per audit type / accounting standard overlays applied to the dictionary;
+            defaults to pbc_keyword_overlays.json next to this module
+        compiled_cache_dir : str or None
+            Directory for precompiled matcher files keyed by dictionary hash;
+            None always compiles at startup
         """
         self.audit_type = audit_type
         self.accounting_standard = accounting_standard
-        self.keyword_dictionary = self._build_keyword_dictionary()
-        
-    def _build_keyword_dictionary(self) -> Dict:
-        """
-        Build comprehensive keyword dictionary for PBC mapping.
-        """
-        
-        keywords = {
-            # ============= ASSETS - NON-CURRENT =============
-            "Fixed Assets - Land": {
-                "keywords": ["land", "freehold", "leasehold", "plot", "site", "premises"],
-                "variations": ["F/H land", "L/H land", "land a/c", "factory land", "office land"]
-            },
-            "Fixed Assets - Building": {
-                "keywords": ["building", "factory", "office", "warehouse", "godown", "shed", "premises", "structure"],
-                "variations": ["bldg", "facto bldg", "off bldg", "building a/c"]
-            },
-            "Fixed Assets - Plant & Machinery": {
-                "keywords": ["plant", "machinery", "equipment", "machine", "apparatus", "CNC", "lathe", "boiler", "generator"],
-                "variations": ["P&M", "plant & mach", "mach", "equip", "production line"]
-            },
-            "Fixed Assets - Furniture & Fixtures": {
-                "keywords": ["furniture", "fixture", "fitting", "furnishing", "desk", "chair", "cabinet", "workstation"],
-                "variations": ["F&F", "furn", "furn & fix", "office furniture"]
-            },
-            "Fixed Assets - Vehicles": {
-                "keywords": ["vehicle", "car", "truck", "van", "transport", "automobile", "motor", "delivery"],
-                "variations": ["veh", "motor veh", "auto", "delivery van"]
-            },
-            "Fixed Assets - Computers & IT Equipment": {
-                "keywords": ["computer", "laptop", "printer", "server", "hardware", "IT equipment", "desktop", "scanner"],
-                "variations": ["comp", "IT equip", "sys", "laptop", "server"]
-            },
-            "Fixed Assets - Electrical Installation": {
-                "keywords": ["electrical", "installation", "fitting", "wiring", "transformer", "UPS", "power"],
-                "variations": ["elec inst", "elec equip", "power", "electrical fitting"]
-            },
-            "Intangible Assets - Goodwill": {
-                "keywords": ["goodwill", "amalgamation", "merger", "acquisition", "business combination"],
-                "variations": ["GW", "goodwill a/c", "goodwill on merger"]
-            },
-            "Intangible Assets - Software": {
-                "keywords": ["software", "license", "application", "ERP", "system", "SAP", "tally", "digital"],
-                "variations": ["soft", "SW", "lic", "ERP", "software license"]
-            },
-            "Intangible Assets - Patents & Trademarks": {
-                "keywords": ["patent", "trademark", "intellectual property", "IP", "copyright", "brand", "logo"],
-                "variations": ["IP", "IPR", "pat", "TM", "brand name"]
-            },
-            "Capital Work in Progress": {
-                "keywords": ["capital work", "WIP", "under construction", "progress", "CWIP", "installation", "development"],
-                "variations": ["CWIP", "WIP", "under const", "building under construction"]
-            },
-            "Investments - Non-Current": {
-                "keywords": ["investment", "shares", "equity", "subsidiary", "associate", "long term", "mutual fund", "bond"],
-                "variations": ["inv", "equity inv", "LT inv", "share investment"]
-            },
-            "Loans & Advances - Non-Current": {
-                "keywords": ["loan", "advance", "subsidiary", "employee", "security deposit", "intercompany"],
-                "variations": ["loan given", "advance to", "deposit paid", "IC loan"]
-            },
-            "Deferred Tax Assets": {
-                "keywords": ["deferred tax", "DTA", "tax asset", "timing difference", "MAT credit", "temporary difference"],
-                "variations": ["DTA", "def tax asset", "MAT"]
-            },
-            
-            # ============= ASSETS - CURRENT =============
-            "Inventories - Raw Materials": {
-                "keywords": ["raw material", "RM", "stock", "inventory", "material"],
-                "variations": ["RM", "raw mat", "mat stock", "raw material inventory"]
-            },
-            "Inventories - Work in Progress": {
-                "keywords": ["work in progress", "WIP", "semi finished", "process", "semi-finished", "goods under process"],
-                "variations": ["WIP", "semi fin", "process", "WIP stock"]
-            },
-            "Inventories - Finished Goods": {
-                "keywords": ["finished goods", "FG", "final product", "product stock", "finished stock"],
-                "variations": ["FG", "fin goods", "product", "finished inventory"]
-            },
-            "Inventories - Stock in Trade": {
-                "keywords": ["trading goods", "stock in trade", "merchandise", "goods for sale", "trading stock"],
-                "variations": ["trading stock", "goods", "merchandise"]
-            },
-            "Inventories - Stores & Spares": {
-                "keywords": ["stores", "spares", "consumables", "maintenance", "spare parts"],
-                "variations": ["S&S", "spares", "consumables", "stores and spares"]
-            },
-            "Trade Receivables - Domestic": {
-                "keywords": ["debtor", "receivable", "sundry debtor", "trade receivable", "customer", "AR", "account receivable"],
-                "variations": ["AR", "debtors", "rec", "sundry debtors", "customer outstanding"]
-            },
-            "Trade Receivables - Export": {
-                "keywords": ["export debtor", "export receivable", "overseas", "foreign debtor", "foreign customer"],
-                "variations": ["export AR", "foreign rec", "overseas customer"]
-            },
-            "Cash on Hand": {
-                "keywords": ["cash", "petty cash", "cash in hand", "till", "cash balance"],
-                "variations": ["cash", "petty", "till", "cash at office"]
-            },
-            "Bank - Current Account": {
-                "keywords": ["bank", "current account", "CC", "cash credit", "OD", "overdraft"],
-                "variations": ["CA", "CC", "OD", "curr a/c", "bank current"]
-            },
-            "Bank - Savings Account": {
-                "keywords": ["bank", "savings", "SB account", "saving bank"],
-                "variations": ["SB", "saving a/c", "savings account"]
-            },
-            "Bank - Fixed Deposit": {
-                "keywords": ["fixed deposit", "FD", "term deposit", "deposit", "bank FD"],
-                "variations": ["FD", "term dep", "bank deposit"]
-            },
-            "GST Input Tax Credit": {
-                "keywords": ["GST input", "ITC", "input tax credit", "CGST", "SGST", "IGST", "input credit"],
-                "variations": ["ITC", "GST ITC", "input", "CGST input", "SGST input"]
-            },
-            "TDS Receivable": {
-                "keywords": ["TDS", "tax deducted", "advance tax", "refund", "TDS credit"],
-                "variations": ["TDS rec", "adv tax", "TDS receivable"]
-            },
-            "Advances to Suppliers": {
-                "keywords": ["advance", "supplier advance", "prepayment", "vendor advance", "advance for purchase"],
-                "variations": ["supp adv", "prepay", "advance to supplier"]
-            },
-            "Prepaid Expenses": {
-                "keywords": ["prepaid", "advance payment", "deferred expense", "unexpired", "prepaid rent", "prepaid insurance"],
-                "variations": ["prepaid exp", "adv exp", "deferred cost"]
-            },
-            
-            # ============= EQUITY =============
-            "Equity Share Capital": {
-                "keywords": ["equity", "share capital", "authorized", "issued", "subscribed", "paid up"],
-                "variations": ["eq cap", "share cap", "equity capital"]
-            },
-            "Share Premium": {
-                "keywords": ["share premium", "securities premium", "capital reserve", "premium account"],
-                "variations": ["share prem", "sec prem", "premium"]
-            },
-            "Reserves & Surplus - General Reserve": {
-                "keywords": ["general reserve", "free reserve", "revenue reserve"],
-                "variations": ["gen res", "free res", "general reserve"]
-            },
-            "Reserves & Surplus - Retained Earnings": {
-                "keywords": ["retained earnings", "profit and loss", "surplus", "accumulated profit", "P&L", "revenue surplus"],
-                "variations": ["RE", "P&L bal", "surplus", "P&L account"]
-            },
-            
-            # ============= LIABILITIES - NON-CURRENT =============
-            "Long Term Borrowings - Term Loans": {
-                "keywords": ["term loan", "secured loan", "bank loan", "financial institution"],
-                "variations": ["TL", "secured loan", "bank term loan"]
-            },
-            "Long Term Borrowings - Debentures": {
-                "keywords": ["debenture", "secured debenture", "bond", "NCD", "debt security"],
-                "variations": ["NCD", "secured deb", "bond", "debenture"]
-            },
-            "Deferred Tax Liability": {
-                "keywords": ["deferred tax", "DTL", "tax liability", "timing difference", "temporary difference"],
-                "variations": ["DTL", "def tax liab", "tax deferral"]
-            },
-            "Provision for Gratuity": {
-                "keywords": ["gratuity", "employee benefit", "retirement", "terminal benefit"],
-                "variations": ["gratuity prov", "terminal", "retirement gratuity"]
-            },
-            
-            # ============= LIABILITIES - CURRENT =============
-            "Short Term Borrowings - Cash Credit": {
-                "keywords": ["cash credit", "CC", "working capital", "bank OD", "overdraft"],
-                "variations": ["CC", "OD", "WC loan", "working capital"]
-            },
-            "Trade Payables - Domestic": {
-                "keywords": ["creditor", "payable", "sundry creditor", "trade payable", "supplier", "AP", "vendor"],
-                "variations": ["AP", "creditors", "payable", "vendor outstanding"]
-            },
-            "Trade Payables - MSME": {
-                "keywords": ["MSME", "micro", "small", "medium enterprise", "MSMED"],
-                "variations": ["MSME cred", "MSME pay", "micro enterprise"]
-            },
-            "Advances from Customers": {
-                "keywords": ["customer advance", "advance received", "unearned", "advance from customer"],
-                "variations": ["cust adv", "adv rec", "customer deposit"]
-            },
-            "GST Payable": {
-                "keywords": ["GST", "CGST", "SGST", "IGST", "output tax", "GST payable", "GST liability"],
-                "variations": ["GST pay", "output GST", "CGST payable", "SGST payable"]
-            },
-            "TDS Payable": {
-                "keywords": ["TDS", "tax deducted", "withholding tax", "TDS payable"],
-                "variations": ["TDS pay", "WHT", "TDS liability"]
-            },
-            "PF Payable": {
-                "keywords": ["provident fund", "PF", "employee PF", "EPFO"],
-                "variations": ["PF pay", "EPFO", "PF liability"]
-            },
-            "ESI Payable": {
-                "keywords": ["ESI", "employee insurance", "ESIC"],
-                "variations": ["ESI pay", "ESIC", "employee state insurance"]
-            },
-            "Salary & Wages Payable": {
-                "keywords": ["salary", "wages", "payroll", "remuneration"],
-                "variations": ["sal pay", "wages pay", "payroll liability"]
-            },
-            "Provision for Income Tax": {
-                "keywords": ["income tax", "tax provision", "current tax"],
-                "variations": ["tax prov", "curr tax", "income tax payable"]
-            },
-            
-            # ============= INCOME - REVENUE =============
-            "Sales - Domestic": {
-                "keywords": ["sales", "revenue", "domestic sales", "turnover", "sale of goods"],
-                "variations": ["sales", "domestic rev", "sale", "turnover"]
-            },
-            "Sales - Export": {
-                "keywords": ["export sales", "export revenue", "foreign sales", "overseas", "export turnover"],
-                "variations": ["export sales", "foreign rev", "overseas sales"]
-            },
-            "Service Income": {
-                "keywords": ["service revenue", "service income", "fees", "consulting", "professional fees"],
-                "variations": ["service rev", "fees", "consulting income"]
-            },
-            "Other Operating Revenue": {
-                "keywords": ["scrap sales", "export incentive", "duty drawback", "subsidy", "MEIS", "SEIS"],
-                "variations": ["scrap", "incentive", "subsidy received"]
-            },
-            
-            # ============= INCOME - OTHER INCOME =============
-            "Interest Income": {
-                "keywords": ["interest", "FD interest", "bank interest", "loan interest", "interest income"],
-                "variations": ["int income", "FD int", "interest received"]
-            },
-            "Dividend Income": {
-                "keywords": ["dividend", "subsidiary dividend", "mutual fund dividend"],
-                "variations": ["div income", "dividend received"]
-            },
-            "Rental Income": {
-                "keywords": ["rent", "rental", "property income", "lease rent"],
-                "variations": ["rent inc", "lease rent", "rental income"]
-            },
-            "Profit on Sale of Assets": {
-                "keywords": ["profit", "asset sale", "gain on disposal", "sale gain"],
-                "variations": ["profit on sale", "disposal gain", "asset sale profit"]
-            },
-            "Foreign Exchange Gain": {
-                "keywords": ["forex gain", "exchange gain", "currency gain", "forex profit"],
-                "variations": ["forex gain", "FX gain", "exchange rate gain"]
-            },
-            "Miscellaneous Income": {
-                "keywords": ["miscellaneous", "sundry income", "other income", "general"],
-                "variations": ["misc income", "sundry inc", "other non-operating"]
-            },
-            
-            # ============= EXPENSES - DIRECT =============
-            "Raw Material Consumed": {
-                "keywords": ["raw material", "consumption", "RM consumed", "material cost"],
-                "variations": ["RM consumed", "mat consumed", "material used"]
-            },
-            "Purchase of Raw Materials": {
-                "keywords": ["raw material purchase", "RM purchase", "material purchase"],
-                "variations": ["RM purchase", "mat purchase", "purchase"]
-            },
-            "Freight Inward": {
-                "keywords": ["freight inward", "inward freight", "transport inward", "carriage"],
-                "variations": ["freight in", "transport in", "carriage inward"]
-            },
-            "Power and Fuel": {
-                "keywords": ["power", "fuel", "electricity", "diesel", "coal"],
-                "variations": ["power & fuel", "elec cost", "electricity"]
-            },
-            "Direct Labour": {
-                "keywords": ["labour", "wages", "direct labour", "worker cost"],
-                "variations": ["labour cost", "wages", "worker wages"]
-            },
-            
-            # ============= EXPENSES - EMPLOYEE BENEFITS =============
-            "Salaries and Wages": {
-                "keywords": ["salary", "wages", "remuneration", "pay", "basic salary"],
-                "variations": ["sal & wages", "remuner", "employee salary"]
-            },
-            "Contribution to PF": {
-                "keywords": ["provident fund", "PF", "EPF", "employer contribution"],
-                "variations": ["PF contrib", "EPF", "PF contribution"]
-            },
-            "Contribution to ESI": {
-                "keywords": ["ESI", "employee insurance", "ESIC", "insurance contribution"],
-                "variations": ["ESI contrib", "ESIC", "ESI contribution"]
-            },
-            "Gratuity Expense": {
-                "keywords": ["gratuity", "terminal benefit", "retirement benefit"],
-                "variations": ["gratuity exp", "terminal", "gratuity provision"]
-            },
-            "Staff Welfare": {
-                "keywords": ["staff welfare", "employee welfare", "welfare expense", "canteen"],
-                "variations": ["welfare exp", "emp welfare", "canteen"]
-            },
-            
-            # ============= EXPENSES - FINANCE COSTS =============
-            "Interest on Term Loans": {
-                "keywords": ["interest", "term loan", "loan interest", "borrowing cost"],
-                "variations": ["TL int", "loan int", "interest expense"]
-            },
-            "Interest on Working Capital": {
-                "keywords": ["interest", "working capital", "CC interest", "OD interest"],
-                "variations": ["WC int", "CC int", "overdraft interest"]
-            },
-            "Bank Charges": {
-                "keywords": ["bank charges", "bank fees", "processing fees", "service charges"],
-                "variations": ["bank charges", "fees", "bank commission"]
-            },
-            
-            # ============= EXPENSES - DEPRECIATION =============
-            "Depreciation": {
-                "keywords": ["depreciation", "depr", "depreciation on", "amortization"],
-                "variations": ["depr", "depreciation", "dep", "amort"]
-            },
-            
-            # ============= EXPENSES - OTHER =============
-            "Rent Expense": {
-                "keywords": ["rent", "rental", "lease rent", "premises"],
-                "variations": ["rent exp", "rental", "office rent"]
-            },
-            "Rates and Taxes": {
-                "keywords": ["rates", "taxes", "property tax", "municipal"],
-                "variations": ["rates & tax", "prop tax", "municipal tax"]
-            },
-            "Insurance Expense": {
-                "keywords": ["insurance", "premium", "policy"],
-                "variations": ["insurance prem", "policy", "insurance expense"]
-            },
-            "Repairs and Maintenance": {
-                "keywords": ["repairs", "maintenance", "R&M", "upkeep"],
-                "variations": ["R&M", "repairs", "maintenance"]
-            },
-            "Telephone and Internet": {
-                "keywords": ["telephone", "internet", "mobile", "communication"],
-                "variations": ["phone", "internet exp", "communication"]
-            },
-            "Printing and Stationery": {
-                "keywords": ["printing", "stationery", "office supplies", "paper"],
-                "variations": ["print & stat", "stationery", "office supplies"]
-            },
-            "Legal and Professional Fees": {
-                "keywords": ["legal", "professional", "consultant", "advisory"],
-                "variations": ["legal & prof", "consultant", "professional fees"]
-            },
-            "Audit Fees": {
-                "keywords": ["audit", "auditor", "statutory audit", "audit charges"],
-                "variations": ["audit fees", "auditor", "CA fees"]
-            },
-            "Travelling and Conveyance": {
-                "keywords": ["travelling", "conveyance", "travel", "transport"],
-                "variations": ["travel & conv", "travel exp", "conveyance"]
-            },
-            "Advertisement": {
-                "keywords": ["advertisement", "publicity", "marketing", "promotion"],
-                "variations": ["adv & pub", "marketing", "advertising"]
-            },
-            "Bad Debts Written Off": {
-                "keywords": ["bad debts", "write off", "irrecoverable", "debt loss"],
-                "variations": ["bad debt", "write off", "debt loss"]
-            },
-            "Foreign Exchange Loss": {
-                "keywords": ["forex loss", "exchange loss", "currency loss", "forex"],
-                "variations": ["forex loss", "FX loss", "exchange rate loss"]
-            },
-            "Miscellaneous Expenses": {
-                "keywords": ["miscellaneous", "sundry expenses", "general", "other"],
-                "variations": ["misc exp", "sundry", "general expenses"]
-            },
-        }
+        self.cache = cache
+        self.dictionary_path = dictionary_path or KEYWORD_DICTIONARY_PATH
+        self.overlays_path = overlays_path or KEYWORD_OVERLAYS_PATH
+        self.compiled_cache_dir = compiled_cache_dir
+        self.keyword_dictionary = self._apply_overlays(self._load_keyword_dictionary())
+        # Content hash; category order is kept because it breaks score ties
+        self.dictionary_version = hashlib.sha256(
+            json.dumps(self.keyword_dictionary, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+        self.cache_version = f"{self.dictionary_version}:v{self.SCORER_VERSION}:k{self.TOP_K}"
+        if not self._load_compiled_matcher():
+            self._compile_keyword_matcher()
+            self._save_compiled_matcher()
+        self._freeze()
+        
+    def _load_keyword_dictionary(self) -> Dict:
+        """
+        Load the keyword dictionary from its JSON data file.
+        
+        Category order is significant: on equal scores the earlier category wins.
+        """
+        with open(self.dictionary_path, encoding="utf-8") as f:
+            return json.load(f)
+    
+    def _apply_overlays(self, keyword_dictionary: Dict) -> Dict:
+        """
+        Apply the overlays for this mapper's audit type and accounting standard.
+        
+        An overlay lists categories to "exclude" and "categories" to add; a
+        category that already exists is replaced in place, new ones are appended.
+        Combinations without an overlay use the base dictionary unchanged.
+        """
+        if not os.path.exists(self.overlays_path):
+            return keyword_dictionary
+        with open(self.overlays_path, encoding="utf-8") as f:
+            overlays = json.load(f)
         
-        return keywords
+        for dimension, value in (("audit_type", self.audit_type),
+                                 ("accounting_standard", self.accounting_standard)):
+            overlay = overlays.get(dimension, {}).get(value, {})
+            for pbc_category in overlay.get("exclude", []):
+                keyword_dictionary.pop(pbc_category, None)
+            keyword_dictionary.update(overlay.get("categories", {}))
+        return keyword_dictionary
+    
+    def _compiled_cache_path(self) -> Optional[str]:
+        """Pickle file holding the compiled matcher for this dictionary version."""
+        if not self.compiled_cache_dir:
+            return None
+        return os.path.join(
+            self.compiled_cache_dir,
+            f"{self.dictionary_version}.c{self.COMPILED_FORMAT}.pkl"
+        )
+    
+    def _load_compiled_matcher(self) -> bool:
+        """
+        Restore the compiled matcher from the cache file, if one exists for
+        this dictionary version. Returns False when it has to be compiled.
+        """
+        path = self._compiled_cache_path()
+        if path is None or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                compiled = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+            return False
+        for attribute in self._COMPILED_ATTRIBUTES:
+            setattr(self, attribute, compiled[attribute])
+        return True
+    
+    def _save_compiled_matcher(self):
+        """Write the compiled matcher to the cache file (best effort)."""
+        path = self._compiled_cache_path()
+        if path is None:
+            return
+        compiled = {attribute: getattr(self, attribute) for attribute in self._COMPILED_ATTRIBUTES}
+        try:
+            os.makedirs(self.compiled_cache_dir, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.compiled_cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
     
     def _normalize_text(self, text: str) -> str:
         """Normalize text for matching."""
@@ -406,10 +249,161 @@ class TrialBalanceToPBCMapper:
             return ""
         text = str(text).lower().strip()
         # Remove special characters but keep spaces and hyphens
-        text = re.sub(r'[^\w\s\-\/]', ' ', text)
+        text = _SPECIAL_CHARACTERS.sub(' ', text)
         # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        return text
+        text = _WHITESPACE.sub(' ', text)
+        return _ABBREVIATION_TOKENS.sub(_expand_abbreviation, text)
+    
+    def normalize_ledgers(self, ledger_names) -> np.ndarray:
+        """
+        Normalize a whole column of ledger names, element-wise identical to
+        _normalize_text; missing names become "".
+        
+        Names are joined with a NUL separator so each regex stage runs once over
+        the column instead of once per name.
+        """
+        names = pd.Series(ledger_names, dtype=object)
+        missing = names.isna().to_numpy()
+        texts = [str(name).lower().strip() for name in names.where(~missing, "")]
+        
+        joined = _COLUMN_SEPARATOR.join(texts)
+        if joined.count(_COLUMN_SEPARATOR) != max(len(texts) - 1, 0):
+            # A name contains the separator itself; fall back to one at a time
+            return np.array([self._normalize_text(name) for name in names.where(~missing, "")], dtype=object)
+        
+        joined = _COLUMN_SPECIAL_CHARACTERS.sub(' ', joined)
+        joined = _COLUMN_WHITESPACE.sub(' ', joined)
+        joined = _COLUMN_ABBREVIATION_TOKENS.sub(_expand_abbreviation, joined)
+        
+        normalized = np.empty(len(texts), dtype=object)
+        normalized[:] = joined.split(_COLUMN_SEPARATOR) if texts else []
+        return normalized
+    
+    def _compile_keyword_matcher(self):
+        """
+        Compile the keyword dictionary into a single automaton.
+        Each normalized keyword/variation carries postings of (category index, weight),
+        so one scan of a ledger yields keyword scores for every category.
+        """
+        self._categories = list(self.keyword_dictionary.keys())
+        pattern_ids: Dict[str, int] = {}
+        self._pattern_postings: List[List[Tuple[int, int]]] = []
+        self._always_postings: List[Tuple[int, int]] = []
+        self._exact_categories: Dict[str, Set[int]] = {}
+        
+        for category_index, pbc_category in enumerate(self._categories):
+            keywords = self.keyword_dictionary[pbc_category]
+            weighted = [(k, 30) for k in keywords.get("keywords", [])] + \
+                       [(v, 20) for v in keywords.get("variations", [])]
+            
+            for keyword, weight in weighted:
+                keyword_normalized = self._normalize_text(keyword)
+                if not keyword_normalized:
+                    # An empty keyword is a substring of every ledger
+                    self._always_postings.append((category_index, weight))
+                    continue
+                if keyword_normalized not in pattern_ids:
+                    pattern_ids[keyword_normalized] = len(self._pattern_postings)
+                    self._pattern_postings.append([])
+                self._pattern_postings[pattern_ids[keyword_normalized]].append((category_index, weight))
+            
+            for keyword in keywords.get("keywords", []):
+                self._exact_categories.setdefault(self._normalize_text(keyword), set()).add(category_index)
+        
+        self._keyword_automaton = _KeywordAutomaton(list(pattern_ids.keys()))
+        
+        # Flat keyword list for batch fuzzy scoring; each category owns a contiguous slice
+        self._fuzzy_keywords: List[str] = []
+        self._fuzzy_offsets = np.zeros(len(self._categories) + 1, dtype=np.int64)
+        for category_index, pbc_category in enumerate(self._categories):
+            keywords = self.keyword_dictionary[pbc_category]
+            self._fuzzy_keywords.extend(keywords.get("keywords", []) + keywords.get("variations", []))
+            self._fuzzy_offsets[category_index + 1] = len(self._fuzzy_keywords)
+        self._fuzzy_choices = [self._normalize_text(k) for k in self._fuzzy_keywords]
+        
+        # Inverted index: keyword tokens and character trigrams -> categories
+        self._token_index: Dict[str, Set[int]] = {}
+        self._trigram_index: Dict[str, Set[int]] = {}
+        for category_index in range(len(self._categories)):
+            start, end = self._fuzzy_offsets[category_index], self._fuzzy_offsets[category_index + 1]
+            for choice in self._fuzzy_choices[start:end]:
+                for token in choice.split():
+                    self._token_index.setdefault(token, set()).add(category_index)
+                for trigram in self._trigrams(choice):
+                    self._trigram_index.setdefault(trigram, set()).add(category_index)
+    
+    def _freeze(self):
+        """
+        Make the dictionary and compiled structures read-only so one instance
+        can be shared safely between sessions and threads.
+        """
+        self.keyword_dictionary = MappingProxyType({
+            pbc_category: MappingProxyType({
+                "keywords": tuple(keywords.get("keywords", [])),
+                "variations": tuple(keywords.get("variations", []))
+            })
+            for pbc_category, keywords in self.keyword_dictionary.items()
+        })
+        self._categories = tuple(self._categories)
+        self._pattern_postings = tuple(tuple(postings) for postings in self._pattern_postings)
+        self._always_postings = tuple(self._always_postings)
+        self._exact_categories = MappingProxyType(
+            {keyword: frozenset(categories) for keyword, categories in self._exact_categories.items()}
+        )
+        self._fuzzy_keywords = tuple(self._fuzzy_keywords)
+        self._fuzzy_choices = tuple(self._fuzzy_choices)
+        self._fuzzy_offsets.setflags(write=False)
+        self._token_index = MappingProxyType(
+            {token: frozenset(categories) for token, categories in self._token_index.items()}
+        )
+        self._trigram_index = MappingProxyType(
+            {trigram: frozenset(categories) for trigram, categories in self._trigram_index.items()}
+        )
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        """Character trigrams of each token, padded so short tokens still index."""
+        trigrams = set()
+        for token in text.split():
+            padded = f" {token} "
+            trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return trigrams
+    
+    def _candidate_categories(self, ledger_normalized: str, keyword_scores: Dict[int, int]) -> List[int]:
+        """
+        Categories worth scoring for a ledger: any keyword hit, a shared token,
+        or at least three shared character trigrams. Returned in dictionary order.
+        """
+        candidates = set(keyword_scores)
+        for token in ledger_normalized.split():
+            candidates.update(self._token_index.get(token, ()))
+        
+        shared_trigrams = Counter()
+        for trigram in self._trigrams(ledger_normalized):
+            shared_trigrams.update(self._trigram_index.get(trigram, ()))
+        candidates.update(category_index for category_index, count in shared_trigrams.items() if count >= 3)
+        
+        return sorted(candidates)
+    
+    def _keyword_scores(self, ledger_normalized: str) -> Dict[int, int]:
+        """
+        Keyword scores for all categories from one scan of a normalized ledger.
+        Returns {category index: score}; categories without hits are omitted.
+        Scores are identical to calling _keyword_match per category.
+        """
+        scores: Dict[int, int] = {}
+        for category_index, weight in self._always_postings:
+            scores[category_index] = scores.get(category_index, 0) + weight
+        
+        for pattern_id in self._keyword_automaton.find(ledger_normalized):
+            for category_index, weight in self._pattern_postings[pattern_id]:
+                scores[category_index] = scores.get(category_index, 0) + weight
+        
+        # Bonus for exact match
+        for category_index in self._exact_categories.get(ledger_normalized, ()):
+            scores[category_index] = scores.get(category_index, 0) + 50
+        
+        return {category_index: min(score, 100) for category_index, score in scores.items()}
     
     def _keyword_match(self, ledger_name: str, pbc_category: str, keywords: Dict) -> int:
         """
@@ -464,51 +458,491 @@ class TrialBalanceToPBCMapper:
         
         return 0, ""
     
-    def map_ledger_to_pbc(self, ledger_name: str, threshold: int = 60) -> Dict:
+    def _rank_categories(self, ledger_normalized: str, keyword_scores: Dict[int, int],
+                         category_indices, fuzzy_results: Dict[int, Tuple[float, str]]) -> List[Tuple]:
         """
-        Map a single ledger to PBC category.
+        Top-k of the given categories by combined score (first in dictionary order wins ties).
+        fuzzy_results memoizes fuzzy scores per category.
+        Returns [(combined_score, category_index, keyword_score, fuzzy_score, fuzzy_keyword)].
         """
-        best_pbc = None
-        best_score = 0
-        best_method = None
-        matched_keyword = ""
-        
-        for pbc_category, keywords in self.keyword_dictionary.items():
-            # Keyword matching
-            keyword_score = self._keyword_match(ledger_name, pbc_category, keywords)
+        ranked = []
+        for category_index in category_indices:
+            keyword_score = keyword_scores.get(category_index, 0)
             
             # Fuzzy matching
-            fuzzy_score, fuzzy_keyword = self._fuzzy_match(ledger_name, pbc_category, keywords)
+            if category_index not in fuzzy_results:
+                fuzzy_results[category_index] = self._fuzzy_match_category(ledger_normalized, category_index)
+            fuzzy_score, fuzzy_keyword = fuzzy_results[category_index]
             
             # Combined score (weighted average)
             combined_score = (keyword_score * 0.6) + (fuzzy_score * 0.4)
-            
-            if combined_score > best_score:
-                best_score = combined_score
-                best_pbc = pbc_category
-                best_method = "keyword" if keyword_score > fuzzy_score else "fuzzy"
-                matched_keyword = fuzzy_keyword if fuzzy_score > keyword_score else ""
+            if combined_score > 0:
+                ranked.append((combined_score, category_index, keyword_score, fuzzy_score, fuzzy_keyword))
         
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked[:self.TOP_K]
+    
+    def _fuzzy_match_category(self, ledger_normalized: str, category_index: int) -> Tuple[float, str]:
+        """Same as _fuzzy_match, but against the precompiled normalized keywords."""
+        start, end = self._fuzzy_offsets[category_index], self._fuzzy_offsets[category_index + 1]
+        if start == end:
+            return 0, ""
+        best_match = process.extractOne(
+            ledger_normalized,
+            self._fuzzy_choices[start:end],
+            scorer=fuzz.token_sort_ratio
+        )
+        if best_match:
+            return best_match[1], self._fuzzy_keywords[start + best_match[2]]
+        return 0, ""
+    
+    def _score_record(self, ranked: List[Tuple]) -> Dict:
+        """Threshold-independent record of a ledger's top-k categories."""
+        record = {
+            "Top_Categories": [self._categories[item[1]] for item in ranked],
+            "Top_Scores": [float(item[0]) for item in ranked],
+            "Match_Method": None,
+            "Matched_Keyword": ""
+        }
+        if ranked:
+            _, _, keyword_score, fuzzy_score, fuzzy_keyword = ranked[0]
+            record["Match_Method"] = "keyword" if keyword_score > fuzzy_score else "fuzzy"
+            record["Matched_Keyword"] = fuzzy_keyword if fuzzy_score > keyword_score else ""
+        return record
+    
+    def _result_at_threshold(self, record: Dict, threshold: int) -> Dict:
+        """Derive the mapping result for a threshold from a score record."""
+        best_score = record["Top_Scores"][0] if record["Top_Scores"] else 0
+        best_pbc = record["Top_Categories"][0] if record["Top_Categories"] else None
         confidence = "High" if best_score >= 80 else "Medium" if best_score >= threshold else "Low"
         
         return {
-            "Ledger_Name": ledger_name,
-            "PBC_Category": best_pbc if best_score >= threshold else "UNMAPPED - Manual Review Required",
+            "PBC_Category": best_pbc if best_score >= threshold else UNMAPPED_CATEGORY,
             "Confidence_Score": round(best_score, 2),
             "Confidence_Level": confidence,
-            "Match_Method": best_method,
-            "Matched_Keyword": matched_keyword
+            "Match_Method": record["Match_Method"],
+            "Matched_Keyword": record["Matched_Keyword"]
         }
     
+    def _score_ledger(self, ledger_normalized: str, prune: bool = True) -> Dict:
+        """
+        Score one normalized ledger against every category (served from the
+        cache when possible) and return its threshold-independent record.
+        """
+        if self.cache is not None:
+            cached = self.cache.get((ledger_normalized, self.cache_version))
+            if cached is not None:
+                return cached
+        
+        # Keyword matching for all categories in one automaton scan
+        keyword_scores = self._keyword_scores(ledger_normalized)
+        
+        # Without a keyword hit a category scores at most 100 * 0.4, so pruning can
+        # only prove the top-k when at least k categories have keyword hits
+        if prune and len(keyword_scores) >= self.TOP_K:
+            candidates = self._candidate_categories(ledger_normalized, keyword_scores)
+            ranked = self._rank_categories(ledger_normalized, keyword_scores, candidates, {})
+            # Unless the top-k candidates all beat that bound, rescan everything
+            proven = len(ranked) == self.TOP_K and ranked[-1][0] > 40
+            if proven or len(candidates) == len(self._categories):
+                record = self._score_record(ranked)
+            else:
+                record = self._score_block([ledger_normalized], workers=1)[0]
+        elif prune:
+            record = self._score_block([ledger_normalized], workers=1)[0]
+        else:
+            all_categories = range(len(self._categories))
+            record = self._score_record(
+                self._rank_categories(ledger_normalized, keyword_scores, all_categories, {})
+            )
+        
+        if self.cache is not None:
+            self.cache.put((ledger_normalized, self.cache_version), record)
+        return record
+    
+    def map_ledger_to_pbc(self, ledger_name: str, threshold: int = 60, prune: bool = True) -> Dict:
+        """
+        Map a single ledger to PBC category.
+        
+        With prune=True only categories sharing a keyword hit, token or trigram
+        with the ledger are scored; results are identical to the exhaustive scan
+        (prune=False), which is still used whenever pruning cannot prove the winner.
+        """
+        record = self._score_ledger(self._normalize_text(ledger_name), prune)
+        return {"Ledger_Name": ledger_name, **self._result_at_threshold(record, threshold)}
+    
+    def _fuzzy_score_matrix(self, ledgers_normalized: List[str],
+                            workers: int = -1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fuzzy scores of many ledgers against every category in one shot.
+        Returns (scores, matrix): a ledgers x categories array with the best
+        token_sort_ratio per category, and the raw ledgers x keywords matrix.
+        """
+        scores = np.zeros((len(ledgers_normalized), len(self._categories)), dtype=np.float64)
+        if not ledgers_normalized or not self._fuzzy_choices:
+            return scores, np.zeros((len(ledgers_normalized), 0), dtype=np.float64)
+        
+        matrix = process.cdist(
+            ledgers_normalized,
+            self._fuzzy_choices,
+            scorer=fuzz.token_sort_ratio,
+            dtype=np.float64,
+            workers=workers
+        )
+        
+        starts, ends = self._fuzzy_offsets[:-1], self._fuzzy_offsets[1:]
+        non_empty = np.flatnonzero(ends > starts)
+        scores[:, non_empty] = np.maximum.reduceat(matrix, starts[non_empty], axis=1)
+        return scores, matrix
+    
+    def _matched_fuzzy_keyword(self, matrix_row: np.ndarray, category_index: int) -> str:
+        """Keyword behind a category's fuzzy score; argmax keeps the first best, like extractOne."""
+        start, end = self._fuzzy_offsets[category_index], self._fuzzy_offsets[category_index + 1]
+        if start == end:
+            return ""
+        return self._fuzzy_keywords[start + int(matrix_row[start:end].argmax())]
+    
+    def _score_block(self, ledgers_normalized: List[str], workers: int = -1) -> List[Dict]:
+        """
+        Score a block of normalized ledgers with one ledger x keyword matrix.
+        Returns one threshold-independent score record per ledger.
+        """
+        records = []
+        n_categories = len(self._categories)
+        
+        keyword_scores = np.zeros((len(ledgers_normalized), n_categories), dtype=np.float64)
+        for row, ledger_normalized in enumerate(ledgers_normalized):
+            for category_index, score in self._keyword_scores(ledger_normalized).items():
+                keyword_scores[row, category_index] = score
+        
+        fuzzy_scores, matrix = self._fuzzy_score_matrix(ledgers_normalized, workers)
+        
+        # Combined score (weighted average)
+        combined = (keyword_scores * 0.6) + (fuzzy_scores * 0.4)
+        # Stable sort keeps the first category in dictionary order on ties
+        top = np.argsort(-combined, axis=1, kind="stable")[:, :self.TOP_K]
+        
+        for row in range(len(ledgers_normalized)):
+            ranked = [
+                (combined[row, category_index], category_index,
+                 keyword_scores[row, category_index], fuzzy_scores[row, category_index], "")
+                for category_index in top[row] if combined[row, category_index] > 0
+            ]
+            if ranked:
+                # Only the winner's matched keyword is reported
+                ranked[0] = ranked[0][:4] + (self._matched_fuzzy_keyword(matrix[row], ranked[0][1]),)
+            records.append(self._score_record(ranked))
+        
+        return records
+    
+    def _score_normalized_batch(self, ledgers_normalized: List[str], block_size: int = 2048,
+                                cache: Optional[MappingCache] = None) -> Tuple[Dict[str, Dict], Dict]:
+        """
+        Score unique normalized ledgers, serving what it can from the cache.
+        Uses the mapper's own cache unless another one is given.
+        Returns ({normalized name: score record}, {'hits': n, 'misses': n}).
+        """
+        cache = cache if cache is not None else self.cache
+        unique = list(dict.fromkeys(ledgers_normalized))
+        records: Dict[str, Dict] = {}
+        
+        if cache is not None:
+            cached = cache.get_many((name, self.cache_version) for name in unique)
+            records = {key[0]: value for key, value in cached.items()}
+        
+        pending = [name for name in unique if name not in records]
+        scored: Dict[str, Dict] = {}
+        for block_start in range(0, len(pending), block_size):
+            block = pending[block_start:block_start + block_size]
+            scored.update(zip(block, self._score_block(block)))
+        
+        if cache is not None:
+            cache.put_many({(name, self.cache_version): record for name, record in scored.items()})
+        
+        records.update(scored)
+        return records, {'hits': len(unique) - len(pending), 'misses': len(pending)}
+    
+    def map_ledgers_batch(self, ledger_names: List[str], threshold: int = 60,
+                          block_size: int = 2048) -> List[Dict]:
+        """
+        Map many ledgers at once using a ledger x keyword score matrix.
+        Results are identical to calling map_ledger_to_pbc for each name, but
+        fuzzy scoring runs vectorized on all cores. Ledgers are processed in
+        blocks of block_size rows to keep the score matrix bounded in memory.
+        """
+        ledgers_normalized = self.normalize_ledgers(ledger_names).tolist()
+        records, _ = self._score_normalized_batch(ledgers_normalized, block_size)
+        return [{"Ledger_Name": name, **self._result_at_threshold(records[normalized], threshold)}
+                for name, normalized in zip(ledger_names, ledgers_normalized)]
+    
     def process_trial_balance(self, 
                             df: pd.DataFrame,
                             ledger_column: str = None,
                             debit_column: str = None,
                             credit_column: str = None,
-                            threshold: int = 60) -> pd.DataFrame:
+                            threshold: int = 60,
+                            batch: bool = True,
+                            include_candidates: bool = False) -> pd.DataFrame:
         """
         Process trial balance DataFrame and map all ledgers to PBC categories.
+        
+        With batch=True (default) every unique ledger is scored in one
+        vectorized pass; batch=False maps each unique ledger with map_ledger_to_pbc.
+        include_candidates=True adds Top_<n>_Category/Top_<n>_Score columns with
+        the TOP_K best categories from the same scoring pass, for manual review.
+        """
+        return self.score_trial_balance(
+            df, ledger_column, debit_column, credit_column, batch
+        ).at_threshold(threshold, include_candidates)
+    
+    def score_trial_balance(self,
+                            df: pd.DataFrame,
+                            ledger_column: str = None,
+                            debit_column: str = None,
+                            credit_column: str = None,
+                            batch: bool = True,
+                            group_column: str = None) -> "ScoredTrialBalance":
+        """
+        Score every ledger once, independent of any threshold.
+        
+        The returned ScoredTrialBalance re-derives process_trial_balance output
+        and generate_pbc_summary numbers for any threshold without rescoring.
+        group_column (e.g. Tally's parent group) adds the group's categories as
+        a weaker signal, see _merge_group_record.
+        """
+        ledger_column, debit_column, credit_column = self._resolve_columns(
+            df, ledger_column, debit_column, credit_column
+        )
+        return self._score_frame(df, ledger_column, debit_column, credit_column, batch,
+                                 group_column=group_column)
+    
+    def iter_process_trial_balance(self,
+                                   path,
+                                   chunksize: int = 100000,
+                                   ledger_column: str = None,
+                                   debit_column: str = None,
+                                   credit_column: str = None,
+                                   threshold: int = 60,
+                                   **read_csv_kwargs) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        Stream a large CSV ledger dump through the mapper chunk by chunk.
+        
+        Yields (result_chunk, running_totals) per chunk, see iter_process_chunks.
+        
+        Parameters:
+        -----------
+        path : str or file-like
+            CSV file to read
+        chunksize : int
+            Rows per chunk
+        read_csv_kwargs :
+            Passed through to pd.read_csv (e.g. sep, encoding)
+        """
+        return self.iter_process_chunks(
+            pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs),
+            ledger_column, debit_column, credit_column, threshold
+        )
+    
+    def iter_process_chunks(self,
+                            chunks: Iterable[pd.DataFrame],
+                            ledger_column: str = None,
+                            debit_column: str = None,
+                            credit_column: str = None,
+                            threshold: int = 60,
+                            group_column: str = None) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
         """
+        Map a stream of trial balance chunks, e.g. from a CSV reader or
+        tb_ingest.iter_tally_xml.
+        
+        Yields (result_chunk, running_totals) per chunk. result_chunk has the same
+        columns as process_trial_balance; running_totals is indexed by PBC_Category
+        with Ledger_Count, Debit_Amount and Credit_Amount accumulated so far.
+        Ledgers already seen in earlier chunks are served from the mapper's cache,
+        or from a bounded in-memory cache when the mapper has none, so peak memory
+        depends on chunk size rather than file size.
+        """
+        seen_cache = self.cache if self.cache is not None else MappingCache(db_path=None)
+        running_totals = pd.DataFrame(
+            columns=["Ledger_Count", "Debit_Amount", "Credit_Amount"],
+            index=pd.Index([], name="PBC_Category"),
+            dtype=np.float64
+        )
+        columns_resolved = False
+        
+        for chunk in chunks:
+            if not columns_resolved:
+                ledger_column, debit_column, credit_column = self._resolve_columns(
+                    chunk, ledger_column, debit_column, credit_column
+                )
+                columns_resolved = True
+            
+            result_chunk = self._score_frame(
+                chunk, ledger_column, debit_column, credit_column, True, seen_cache, group_column
+            ).at_threshold(threshold)
+            
+            chunk_totals = pd.DataFrame({
+                "PBC_Category": result_chunk["PBC_Category"],
+                "Ledger_Count": 1.0,
+                "Debit_Amount": pd.to_numeric(result_chunk.get("Debit_Amount"), errors="coerce"),
+                "Credit_Amount": pd.to_numeric(result_chunk.get("Credit_Amount"), errors="coerce")
+            }).groupby("PBC_Category").sum()
+            running_totals = running_totals.add(chunk_totals, fill_value=0)
+            
+            yield result_chunk, running_totals.astype({"Ledger_Count": np.int64})
+    
+    def revise_trial_balance(self,
+                             previous: pd.DataFrame,
+                             df: pd.DataFrame,
+                             ledger_column: str = None,
+                             debit_column: str = None,
+                             credit_column: str = None,
+                             threshold: int = 60,
+                             remap_all: bool = False,
+                             group_column: Optional[str] = None) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Map a revised trial balance, reusing the previous mapping for every
+        ledger that is still present.
+        
+        Ledgers are matched by normalized name. Only added ledgers (including
+        renamed ones) are scored; unchanged and amount-changed ledgers keep their
+        previous mapping. A removed and an added ledger with identical totals are
+        reported as a rename.
+        
+        Parameters:
+        -----------
+        previous : pd.DataFrame
+            Earlier process_trial_balance output for the same project
+        remap_all : bool
+            Score every ledger anyway, e.g. when the previous mapping was made with
+            another dictionary version or threshold
+        group_column : str, optional
+            Parent group column (Tally XML), merged into the scores of the ledgers
+            scored here as in score_trial_balance. The mapping is kept per ledger
+            name, so a ledger takes the group of its first row.
+        
+        Returns:
+        --------
+        (result_df, changes) : result_df has the process_trial_balance columns;
+        changes lists added, removed, renamed and amount_changed ledgers, the
+        PBC categories they touch and the time taken
+        """
+        start = time.perf_counter()
+        ledger_column, debit_column, credit_column = self._resolve_columns(
+            df, ledger_column, debit_column, credit_column
+        )
+        ledgers = df[ledger_column]
+        ledger_text = ledgers.astype(str)
+        keep = (ledgers.notna() & (ledger_text.str.strip() != "")).to_numpy()
+        codes, unique_ledgers = pd.factorize(ledger_text[keep])
+        unique_normalized = self.normalize_ledgers(unique_ledgers)
+        
+        amounts = {}
+        if debit_column and debit_column in df.columns:
+            amounts["Debit_Amount"] = df[debit_column].to_numpy()[keep]
+        if credit_column and credit_column in df.columns:
+            amounts["Credit_Amount"] = df[credit_column].to_numpy()[keep]
+        
+        new_totals = self._ledger_totals(unique_normalized[codes], amounts)
+        previous_normalized = self.normalize_ledgers(previous['Original_Ledger_Name'].astype(str))
+        previous_totals = self._ledger_totals(previous_normalized, {
+            column: previous[column].to_numpy() for column in ("Debit_Amount", "Credit_Amount")
+            if column in previous.columns
+        })
+        previous_mapping = previous[MAPPING_COLUMNS].astype(object).set_axis(previous_normalized).groupby(level=0).first()
+        # Stored scores may be float32; they were rounded to 2 places when mapped
+        previous_mapping["Confidence_Score"] = previous_mapping["Confidence_Score"].astype(np.float64).round(2)
+        
+        # Diff by normalized name
+        added = new_totals.index.difference(previous_totals.index, sort=False)
+        removed = previous_totals.index.difference(new_totals.index, sort=False)
+        common = new_totals.index.intersection(previous_totals.index, sort=False)
+        common_amounts = new_totals.loc[common].join(previous_totals.loc[common], rsuffix="_previous")
+        current_columns = list(new_totals.columns.intersection(previous_totals.columns))
+        moved = np.zeros(len(common), dtype=bool)
+        for column in current_columns:
+            moved |= ~np.isclose(common_amounts[column].to_numpy(dtype=np.float64),
+                                 common_amounts[f"{column}_previous"].to_numpy(dtype=np.float64), atol=0.005)
+        amount_changed = common[moved]
+        
+        # A ledger that disappears while one with the same totals appears was renamed
+        removed_by_totals: Dict[Tuple, List[str]] = {}
+        for name, row in previous_totals.loc[removed].iterrows():
+            removed_by_totals.setdefault(tuple(np.round(row.to_numpy(dtype=np.float64), 2)), []).append(name)
+        renamed = []
+        for name, row in new_totals.loc[added].iterrows():
+            totals = tuple(np.round(row.to_numpy(dtype=np.float64), 2))
+            if any(totals) and removed_by_totals.get(totals):
+                renamed.append((removed_by_totals[totals].pop(0), name))
+        
+        to_score = list(dict.fromkeys(unique_normalized)) if remap_all else list(added)
+        records, _ = self._score_normalized_batch(to_score)
+        if group_column and group_column in df.columns and to_score:
+            row_names = unique_normalized[codes]
+            row_groups = df[group_column].fillna("").astype(str).to_numpy()[keep]
+            # Reversed so the first row of each ledger wins
+            group_of = dict(zip(row_names[::-1], row_groups[::-1]))
+            unique_groups = list(dict.fromkeys(group_of[name] for name in to_score))
+            normalized_groups = dict(zip(unique_groups, self.normalize_ledgers(unique_groups)))
+            group_records, _ = self._score_normalized_batch(list(normalized_groups.values()))
+            records = {
+                name: self._merge_group_record(records[name], group_records[normalized_groups[group_of[name]]])
+                for name in to_score
+            }
+        scored_mapping = pd.DataFrame(
+            [self._result_at_threshold(records[name], threshold) for name in to_score],
+            index=pd.Index(to_score, dtype=object), columns=MAPPING_COLUMNS
+        )
+        mapping = pd.concat([scored_mapping, previous_mapping.drop(scored_mapping.index, errors="ignore")])
+        mapping = mapping.loc[unique_normalized]
+        
+        columns = {
+            "S.No": np.asarray(df.index[keep]) + 1,
+            "Original_Ledger_Name": ledgers.to_numpy()[keep]
+        }
+        for column in MAPPING_COLUMNS:
+            columns[column] = mapping[column].to_numpy(dtype=object)[codes]
+        columns["Confidence_Score"] = columns["Confidence_Score"].astype(np.float64)
+        columns.update(amounts)
+        result_df = pd.DataFrame(columns)
+        
+        # PBC categories whose ledgers or totals changed, before and after
+        touched_before = removed.append(amount_changed)
+        touched_after = added.append(amount_changed)
+        affected = set(previous_mapping.loc[touched_before, "PBC_Category"]) | \
+            set(mapping.loc[touched_after, "PBC_Category"])
+        if remap_all:
+            affected |= set(previous_mapping["PBC_Category"]) | set(mapping["PBC_Category"])
+        affected.discard(UNMAPPED_CATEGORY)
+        
+        # Report original spellings rather than normalized names
+        display = dict(zip(unique_normalized, unique_ledgers))
+        previous_display = dict(zip(previous_normalized, previous['Original_Ledger_Name'].astype(str)))
+        changes = {
+            'unchanged': len(common) - len(amount_changed),
+            'amount_changed': [display[name] for name in amount_changed],
+            'added': [display[name] for name in added],
+            'removed': [previous_display[name] for name in removed],
+            'renamed': [(previous_display[old], display[new]) for old, new in renamed],
+            'remapped': len(to_score),
+            'affected_categories': sorted(affected),
+            'seconds': round(time.perf_counter() - start, 4)
+        }
+        return result_df, changes
+    
+    @staticmethod
+    def _ledger_totals(normalized: np.ndarray, amounts: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Amount columns summed per normalized ledger name."""
+        totals = pd.DataFrame(
+            {column: pd.to_numeric(pd.Series(values), errors="coerce").fillna(0).to_numpy()
+             for column, values in amounts.items()},
+            index=pd.Index(normalized, dtype=object)
+        )
+        return totals.groupby(level=0, sort=False).sum()
+    
+    def _resolve_columns(self, df: pd.DataFrame, ledger_column: Optional[str],
+                         debit_column: Optional[str],
+                         credit_column: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+        """Auto-detect any column not given explicitly and validate the ledger column."""
         # Auto-detect ledger column if not provided
         if ledger_column is None:
             ledger_column = self._detect_ledger_column(df)
@@ -522,43 +956,90 @@ class TrialBalanceToPBCMapper:
         if credit_column is None:
             credit_column = self._detect_amount_column(df, ["credit", "cr", "credit amount", "cr amount"])
         
-        # Process each ledger
-        results = []
+        return ledger_column, debit_column, credit_column
+    
+    def _score_unique(self, normalized: List[str], batch: bool,
+                      cache: Optional[MappingCache] = None) -> Tuple[List[Dict], Dict]:
+        """Score records for unique normalized names, in order, plus cache stats."""
+        if batch:
+            records, cache_stats = self._score_normalized_batch(normalized, cache=cache)
+            return [records[name] for name in normalized], cache_stats
+        return [self._score_ledger(name) for name in normalized], {'hits': 0, 'misses': 0}
+    
+    def _merge_group_record(self, record: Dict, group_record: Dict) -> Dict:
+        """
+        Add a parent group's categories to a ledger's record at GROUP_WEIGHT.
+        A category keeps its better score; the group wins only where the
+        ledger name itself is weak.
+        """
+        scores = dict(zip(record["Top_Categories"], record["Top_Scores"]))
+        group_wins = set()
+        for pbc_category, score in zip(group_record["Top_Categories"], group_record["Top_Scores"]):
+            if score * self.GROUP_WEIGHT > scores.get(pbc_category, 0):
+                scores[pbc_category] = score * self.GROUP_WEIGHT
+                group_wins.add(pbc_category)
+        if not group_wins:
+            return record
         
-        for idx, row in df.iterrows():
-            ledger_name = row[ledger_column]
-            
-            # Skip empty ledgers
-            if pd.isna(ledger_name) or str(ledger_name).strip() == "":
-                continue
-            
-            mapping_result = self.map_ledger_to_pbc(str(ledger_name), threshold)
-            
-            # Add original amounts
-            result_row = {
-                "S.No": idx + 1,
-                "Original_Ledger_Name": ledger_name,
-                "PBC_Category": mapping_result["PBC_Category"],
-                "Confidence_Score": mapping_result["Confidence_Score"],
-                "Confidence_Level": mapping_result["Confidence_Level"],
-                "Match_Method": mapping_result["Match_Method"],
-                "Matched_Keyword": mapping_result["Matched_Keyword"]
-            }
-            
-            # Add amount columns if available
-            if debit_column and debit_column in df.columns:
-                result_row["Debit_Amount"] = row[debit_column]
-            if credit_column and credit_column in df.columns:
-                result_row["Credit_Amount"] = row[credit_column]
-            
-            results.append(result_row)
+        # Stable sort keeps the ledger's own order on ties
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:self.TOP_K]
+        merged = {
+            "Top_Categories": [pbc_category for pbc_category, _ in ranked],
+            "Top_Scores": [score for _, score in ranked],
+            "Match_Method": record["Match_Method"],
+            "Matched_Keyword": record["Matched_Keyword"]
+        }
+        if ranked and ranked[0][0] in group_wins:
+            merged["Match_Method"] = "group"
+            merged["Matched_Keyword"] = group_record["Matched_Keyword"]
+        return merged
+    
+    def _score_frame(self, df: pd.DataFrame, ledger_column: str, debit_column: Optional[str],
+                     credit_column: Optional[str], batch: bool,
+                     cache: Optional[MappingCache] = None,
+                     group_column: Optional[str] = None) -> "ScoredTrialBalance":
+        """Columnar scoring of one frame whose columns are already resolved."""
+        ledgers = df[ledger_column]
+        ledger_text = ledgers.astype(str)
         
-        result_df = pd.DataFrame(results)
+        # Skip empty ledgers
+        keep = (ledgers.notna() & (ledger_text.str.strip() != "")).to_numpy()
         
-        return result_df
+        # Score each unique ledger once; rows refer to it by code
+        codes, unique_ledgers = pd.factorize(ledger_text[keep])
+        normalized = self.normalize_ledgers(unique_ledgers).tolist()
+        unique_records, cache_stats = self._score_unique(normalized, batch, cache)
+        
+        if group_column and group_column in df.columns:
+            # Groups are few; score each once and merge per unique (ledger, group) pair
+            group_codes, unique_groups = pd.factorize(df[group_column].fillna("").astype(str).to_numpy()[keep])
+            group_records, _ = self._score_unique(self.normalize_ledgers(unique_groups).tolist(), batch, cache)
+            n_groups = max(len(unique_groups), 1)
+            codes, pairs = pd.factorize(codes.astype(np.int64) * n_groups + group_codes)
+            unique_records = [
+                self._merge_group_record(unique_records[pair // n_groups], group_records[pair % n_groups])
+                for pair in pairs
+            ]
+        
+        amounts = {}
+        # Add amount columns if available
+        if debit_column and debit_column in df.columns:
+            amounts["Debit_Amount"] = df[debit_column].to_numpy()[keep]
+        if credit_column and credit_column in df.columns:
+            amounts["Credit_Amount"] = df[credit_column].to_numpy()[keep]
+        
+        return ScoredTrialBalance(
+            records=unique_records,
+            codes=codes,
+            row_numbers=np.asarray(df.index[keep]) + 1,
+            ledger_names=ledgers.to_numpy()[keep],
+            amounts=amounts,
+            top_k=self.TOP_K,
+            cache_stats=cache_stats
+        )
     
-    def _detect_ledger_column(self, df: pd.DataFrame) -> str:
-        """Auto-detect ledger name column."""
+    def _detect_ledger_column(self, df: pd.DataFrame, sample_rows: int = 50) -> str:
+        """Auto-detect ledger name column by header name, else by value profile."""
         possible_names = [
             'ledger', 'ledger name', 'account', 'account name', 
             'particulars', 'description', 'ledger_name', 'account_name',
@@ -566,11 +1047,18 @@ class TrialBalanceToPBCMapper:
         ]
         
         for col in df.columns:
-            if any(name in col.lower() for name in possible_names):
+            if any(name in str(col).lower() for name in possible_names):
                 return col
         
-        # Default to first column if no match
-        return df.columns[0]
+        # No telling header: pick the most varied text column from a sample of values
+        sample = df.head(sample_rows)
+        
+        def text_profile(col) -> float:
+            values = sample[col].dropna().astype(str).str.strip()
+            text = values[(values != "") & pd.to_numeric(values.str.replace(",", ""), errors="coerce").isna()]
+            return len(text) / max(len(sample), 1) * text.nunique() / max(len(text), 1)
+        
+        return max(df.columns, key=text_profile) if len(sample) else df.columns[0]
     
     def _detect_amount_column(self, df: pd.DataFrame, keywords: List[str]) -> Optional[str]:
         """Auto-detect amount columns."""
@@ -601,3 +1089,192 @@ class TrialBalanceToPBCMapper:
         }
         
         return summary
+
+
+class ScoredTrialBalance:
+    """
+    Threshold-independent scoring result for a trial balance.
+    
+    Holds each unique ledger's top-k categories and scores as arrays plus a
+    code per row, so PBC_Category, Confidence_Level and summary numbers can be
+    re-derived for any threshold in O(n) without rescoring.
+    """
+    
+    def __init__(self, records: List[Dict], codes: np.ndarray, row_numbers: np.ndarray,
+                 ledger_names: np.ndarray, amounts: Dict[str, np.ndarray], top_k: int,
+                 cache_stats: Optional[Dict] = None):
+        n_unique = len(records)
+        self.codes = codes
+        self.row_numbers = row_numbers
+        self.ledger_names = ledger_names
+        self.amounts = amounts
+        self.cache_stats = cache_stats or {'hits': 0, 'misses': 0}
+        
+        # Category names are stored once; candidates refer to them by int16 code
+        category_codes: Dict[str, int] = {}
+        self.top_categories = np.full((n_unique, top_k), -1, dtype=np.int16)
+        self.top_scores = np.full((n_unique, top_k), np.nan, dtype=np.float32)
+        self.best_score = np.zeros(n_unique, dtype=np.float64)
+        self.rounded_score = np.zeros(n_unique, dtype=np.float64)
+        self.match_method = np.empty(n_unique, dtype=object)
+        self.matched_keyword = np.empty(n_unique, dtype=object)
+        
+        for row, record in enumerate(records):
+            for rank, (pbc_category, score) in enumerate(zip(record["Top_Categories"], record["Top_Scores"])):
+                self.top_categories[row, rank] = category_codes.setdefault(pbc_category, len(category_codes))
+                self.top_scores[row, rank] = score
+            best_score = record["Top_Scores"][0] if record["Top_Scores"] else 0
+            self.best_score[row] = best_score
+            self.rounded_score[row] = round(best_score, 2)
+            self.match_method[row] = record["Match_Method"]
+            self.matched_keyword[row] = record["Matched_Keyword"]
+        
+        self.category_names = np.empty(len(category_codes) + 1, dtype=object)
+        self.category_names[:-1] = list(category_codes)
+        self.category_names[-1] = None  # code -1: no candidate
+        self.best_category = self.category_names[self.top_categories[:, 0]] if n_unique else \
+            np.empty(0, dtype=object)
+        self._row_counts = np.bincount(codes, minlength=n_unique)
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def _levels(self, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Per unique ledger: (PBC_Category, Confidence_Level) at a threshold."""
+        mapped = self.best_score >= threshold
+        categories = np.where(mapped, self.best_category, UNMAPPED_CATEGORY).astype(object)
+        levels = np.where(self.best_score >= 80, "High", np.where(mapped, "Medium", "Low")).astype(object)
+        return categories, levels
+    
+    def at_threshold(self, threshold: int = 60, include_candidates: bool = False) -> pd.DataFrame:
+        """
+        Mapping result for a threshold, same columns as process_trial_balance.
+        include_candidates=True appends the top-k candidate columns.
+        """
+        categories, levels = self._levels(threshold)
+        codes = self.codes
+        
+        columns = {
+            "S.No": self.row_numbers,
+            "Original_Ledger_Name": self.ledger_names,
+            "PBC_Category": categories[codes],
+            "Confidence_Score": self.rounded_score[codes],
+            "Confidence_Level": levels[codes],
+            "Match_Method": self.match_method[codes],
+            "Matched_Keyword": self.matched_keyword[codes]
+        }
+        columns.update(self.amounts)
+        if include_candidates:
+            columns.update(self.candidate_columns())
+        
+        result_df = pd.DataFrame(columns)
+        # How much of this TB was served from the mapping cache (unique ledgers)
+        result_df.attrs['cache_stats'] = self.cache_stats
+        return result_df
+    
+    def candidate_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Top_<n>_Category and Top_<n>_Score per TB row, best first.
+        Ranks with no candidate hold None and NaN.
+        """
+        codes = self.codes
+        columns = {}
+        for rank in range(self.top_categories.shape[1]):
+            columns[f"Top_{rank + 1}_Category"] = self.category_names[self.top_categories[codes, rank]]
+            columns[f"Top_{rank + 1}_Score"] = np.round(self.top_scores[codes, rank].astype(np.float64), 2)
+        return columns
+    
+    def candidates(self, row: int) -> List[Tuple[str, float]]:
+        """(category, score) candidates for one TB row position, best first."""
+        code = self.codes[row]
+        return [(self.category_names[category], round(float(score), 2))
+                for category, score in zip(self.top_categories[code], self.top_scores[code])
+                if category >= 0]
+    
+    def summary(self, threshold: int = 60) -> Dict:
+        """generate_pbc_summary numbers for a threshold, without building the frame."""
+        total = len(self.codes)
+        if total == 0:
+            return {
+                'total_ledgers': 0,
+                'high_confidence': 0,
+                'medium_confidence': 0,
+                'low_confidence': 0,
+                'avg_confidence_score': 0,
+                'success_rate': 0
+            }
+        
+        high = self.best_score >= 80
+        medium = ~high & (self.best_score >= threshold)
+        high_count = int(self._row_counts[high].sum())
+        medium_count = int(self._row_counts[medium].sum())
+        
+        return {
+            'total_ledgers': total,
+            'high_confidence': high_count,
+            'medium_confidence': medium_count,
+            'low_confidence': total - high_count - medium_count,
+            'avg_confidence_score': round(self.rounded_score[self.codes].mean(), 2),
+            'success_rate': round(((high_count + medium_count) / total * 100), 2)
+        }
+    
+    def unmapped_count(self, threshold: int = 60) -> int:
+        """Ledgers that would need manual review at a threshold."""
+        return int(self._row_counts[self.best_score < threshold].sum())
+    
+    def mapped_category_count(self, threshold: int = 60) -> int:
+        """Distinct PBC categories that at least one ledger maps to at a threshold."""
+        mapped = self.best_score >= threshold
+        return len(np.unique(self.top_categories[mapped, 0]))
+
+
+# Process-wide registry of compiled mappers, keyed by (audit_type, accounting_standard)
+_MAPPER_REGISTRY: Dict[Tuple[str, str], TrialBalanceToPBCMapper] = {}
+_MAPPER_REGISTRY_LOCK = threading.Lock()
+
+
+def get_shared_mapper(audit_type: str = "Stat", accounting_standard: str = "Indian GAAP",
+                      cache: Optional[MappingCache] = None) -> TrialBalanceToPBCMapper:
+    """
+    Return the process-wide compiled mapper for an audit type and standard.
+    
+    The mapper is built on first use and then shared by every caller, so the
+    keyword automaton and indexes are compiled once per server process. The
+    cache is attached when the mapper is first built.
+    """
+    key = (audit_type, accounting_standard)
+    mapper = _MAPPER_REGISTRY.get(key)
+    if mapper is None:
+        with _MAPPER_REGISTRY_LOCK:
+            mapper = _MAPPER_REGISTRY.get(key)
+            if mapper is None:
+                mapper = TrialBalanceToPBCMapper(audit_type, accounting_standard, cache=cache)
+                _MAPPER_REGISTRY[key] = mapper
+    return mapper
+
+
+def precompile_dictionaries(compiled_cache_dir: str = COMPILED_CACHE_DIR,
+                            overlays_path: str = KEYWORD_OVERLAYS_PATH) -> Dict[str, int]:
+    """
+    Compile the dictionary for every audit type / accounting standard
+    combination in the overlays file and write each to the compiled cache,
+    so no session pays for compiling at first use.
+    
+    Returns the number of categories scored per combination.
+    """
+    with open(overlays_path, encoding="utf-8") as f:
+        overlays = json.load(f)
+    
+    categories = {}
+    for audit_type in overlays.get("audit_type", {}) or ["Stat"]:
+        for accounting_standard in overlays.get("accounting_standard", {}) or ["Indian GAAP"]:
+            mapper = TrialBalanceToPBCMapper(audit_type, accounting_standard, overlays_path=overlays_path,
+                                             compiled_cache_dir=compiled_cache_dir)
+            categories[f"{audit_type} / {accounting_standard}"] = len(mapper.keyword_dictionary)
+    return categories
+
+
+if __name__ == "__main__":
+    # Deployment step: python tb_mapper.py
+    for combination, category_count in precompile_dictionaries().items():
+        print(f"{combination}: {category_count} categories")
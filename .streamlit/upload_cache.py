@@ -0,0 +1,104 @@
+"""
+Trial Balance Upload Cache
+Recognizes re-uploaded trial balance files by a hash of their bytes and keeps
+the parsed DataFrame and threshold-independent scoring result, so a repeat
+upload skips both parsing and the mapper.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, BinaryIO, Optional
+
+import pandas as pd
+
+UPLOAD_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "upload_cache")
+
+
+def hash_upload(file: BinaryIO, block_size: int = 1 << 20) -> str:
+    """sha256 of a file-like object, read in blocks so large uploads are never copied whole."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(block_size), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """
+    On-disk cache keyed by upload hash.
+
+    The parsed frame is keyed by the hash and reader version; scoring results
+    are keyed by hash, reader version and mapper cache_version, so a second
+    engagement type on the same TB reuses the parsed frame but is scored with
+    its own dictionary, and a reader change invalidates both.
+    """
+
+    def __init__(self, cache_dir: str = UPLOAD_CACHE_DIR, max_files: int = 200):
+        """
+        Parameters:
+        -----------
+        cache_dir : str
+            Directory holding the cached frames and scoring results
+        max_files : int
+            Oldest files are removed beyond this many
+        """
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest: str, kind: str, version: Optional[str] = None) -> str:
+        suffix = f"{kind}.{hashlib.sha256(version.encode('utf-8')).hexdigest()[:16]}" if version else kind
+        return os.path.join(self.cache_dir, f"{digest}.{suffix}.pkl")
+
+    def _load(self, path: str) -> Optional[Any]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+            return None
+        # Touch so eviction removes the least recently used entries first
+        os.utime(path)
+        return value
+
+    def _save(self, path: str, value: Any):
+        with self._lock:
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        """Remove the least recently used files beyond max_files."""
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.endswith(".pkl")]
+        if len(paths) <= self.max_files:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_frame(self, digest: str, version: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Parsed DataFrame of an earlier upload with this hash, read by this reader version."""
+        return self._load(self._path(digest, "frame", version))
+
+    def put_frame(self, digest: str, df: pd.DataFrame, version: Optional[str] = None):
+        self._save(self._path(digest, "frame", version), df)
+
+    def get_scored(self, digest: str, version: str):
+        """Scoring result of an earlier upload with this hash, read and scored by these versions."""
+        return self._load(self._path(digest, "scored", version))
+
+    def put_scored(self, digest: str, version: str, scored):
+        self._save(self._path(digest, "scored", version), scored)